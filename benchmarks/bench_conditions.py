@@ -0,0 +1,95 @@
+"""
+Compares the interpreted `Condition.evaluate` with the compiled, the optimized and the columnar (NumPy) filters.
+
+Run with: python -m benchmarks.bench_conditions
+"""
+import random
+import timeit
+from datetime import timedelta
+from typing import List
+
+from src.pump_scraper import PumpScraperToken
+from src.utils.columnar import build_columns, filter_columnar
+from src.utils.condition import Condition, ConditionBase, ConditionConstant, OperatorEnum
+from src.utils.scripts import hours_ago
+from src.utils.timestamps import utc_now
+
+ROWS = 100_000
+REPEAT = 5
+
+
+def make_rows(count: int = ROWS, seed: int = 7) -> List[PumpScraperToken]:
+    rnd = random.Random(seed)
+    now = utc_now()
+    rows = []
+    for i in range(count):
+        created = now - timedelta(minutes=rnd.randint(0, 60 * 48))
+        rows.append(PumpScraperToken(
+            mint=f"mint{i}",
+            name=f"Token {i}",
+            symbol=f"T{i}",
+            description=None,
+            creator=f"creator{i % 500}",
+            market_cap=rnd.uniform(20, 500),
+            usd_market_cap=rnd.uniform(4_000, 100_000),
+            created_timestamp=created,
+            image_uri=None,
+            metadata_uri=None,
+            bonding_curve=None,
+            associated_bonding_curve=None,
+            complete=rnd.random() < 0.1,
+            virtual_sol_reserves=rnd.randint(10 ** 9, 10 ** 11),
+            virtual_token_reserves=rnd.randint(10 ** 14, 10 ** 15),
+            total_supply=10 ** 15,
+            show_name=True,
+            last_trade_timestamp=created + timedelta(minutes=rnd.randint(0, 120)),
+            king_of_the_hill_timestamp=created if rnd.random() < 0.2 else None,
+            reply_count=rnd.randint(0, 100),
+            last_reply=None,
+            nsfw=False,
+            is_currently_live=False,
+        ))
+    return rows
+
+
+def make_conditions() -> ConditionBase[PumpScraperToken]:
+    # same left-deep shape as `build_filters`
+    conditions = ConditionConstant(is_true=True)
+    conditions = conditions & Condition("created_timestamp", OperatorEnum.GTE, hours_ago(24))
+    conditions = conditions & Condition("last_trade_timestamp", OperatorEnum.GTE, hours_ago(12))
+    conditions = conditions & Condition("king_of_the_hill_timestamp", OperatorEnum.NOT_NULL, True)
+    conditions = conditions & Condition("market_cap", OperatorEnum.GTE, 50)
+    conditions = conditions & Condition("market_cap", OperatorEnum.LTE, 400)
+    conditions = conditions & Condition("creator", OperatorEnum.NOT_IN, {f"creator{i}" for i in range(50)})
+    return conditions
+
+
+def main():
+    rows = make_rows()
+    conditions = make_conditions()
+    predicate = conditions.compile()
+    optimized_predicate = conditions.optimize(rows[:200]).compile()
+
+    interpreted = [r.mint for r in filter(conditions.evaluate, rows)]
+    compiled = [r.mint for r in filter(predicate, rows)]
+    optimized = [r.mint for r in filter(optimized_predicate, rows)]
+    assert interpreted == compiled, "compiled predicate disagrees with evaluate"
+    assert interpreted == optimized, "optimized predicate disagrees with evaluate"
+    assert interpreted == [r.mint for r in filter_columnar(conditions, rows)], "columnar filter disagrees with evaluate"
+
+    evaluate_time = min(timeit.repeat(lambda: list(filter(conditions.evaluate, rows)), number=1, repeat=REPEAT))
+    compiled_time = min(timeit.repeat(lambda: list(filter(predicate, rows)), number=1, repeat=REPEAT))
+    optimized_time = min(timeit.repeat(lambda: list(filter(optimized_predicate, rows)), number=1, repeat=REPEAT))
+    columns = build_columns(rows, sorted(conditions.fields()))
+    build_time = min(timeit.repeat(lambda: build_columns(rows, sorted(conditions.fields())), number=1, repeat=REPEAT))
+    columnar_time = min(timeit.repeat(lambda: filter_columnar(conditions, rows, columns), number=1, repeat=REPEAT))
+    print(f"{ROWS} rows, {len(compiled)} matches")
+    print(f"evaluate: {evaluate_time * 1000:.1f} ms")
+    print(f"compiled: {compiled_time * 1000:.1f} ms ({evaluate_time / compiled_time:.1f}x)")
+    print(f"optimized: {optimized_time * 1000:.1f} ms ({evaluate_time / optimized_time:.1f}x)")
+    print(f"columnar: {columnar_time * 1000:.1f} ms ({evaluate_time / columnar_time:.1f}x), "
+          f"plus {build_time * 1000:.1f} ms to build the columns from models")
+
+
+if __name__ == "__main__":
+    main()
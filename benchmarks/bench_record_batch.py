@@ -0,0 +1,63 @@
+"""
+Compares the memory and filter time of a list of `PumpScraperToken`s with the same rows in a `RecordBatch`.
+
+Run with: python -m benchmarks.bench_record_batch
+"""
+import gc
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.bench_conditions import make_conditions, make_rows
+from src.pump_scraper import PumpScraperToken
+from src.utils.columnar import filter_rows
+from src.utils.record_batch import RecordBatch
+
+ROWS = 50_000
+REPEAT = 5
+
+
+def measure_memory():
+    """Bytes per row of the models, then of a batch holding the same rows once the models are dropped."""
+    gc.collect()
+    tracemalloc.start()
+    rows = make_rows(ROWS)
+    rows_size = tracemalloc.get_traced_memory()[0]
+    batch = RecordBatch.from_records(PumpScraperToken, rows)
+    del rows
+    gc.collect()
+    batch_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the batch must still be alive when its memory is measured
+    assert len(batch) == ROWS
+    return rows_size / ROWS, batch_size / ROWS
+
+
+def main():
+    rows_size, batch_size = measure_memory()
+    rows = make_rows(ROWS)
+    batch = RecordBatch.from_records(PumpScraperToken, rows)
+    conditions = make_conditions()
+
+    expected = [r.mint for r in filter_rows(conditions, rows)]
+    assert expected == [r.mint for r in batch.filter(conditions).to_records()], "batch filter disagrees with models"
+    # timestamps are kept to the millisecond, like the api sends them
+    for name, value in batch.record(0).model_dump().items():
+        original = getattr(rows[0], name)
+        if isinstance(value, datetime):
+            assert abs(value - original) < timedelta(milliseconds=1), f"round trip changed {name}"
+        else:
+            assert value == original, f"round trip changed {name}"
+
+    models_time = min(timeit.repeat(lambda: filter_rows(conditions, rows), number=1, repeat=REPEAT))
+    batch_time = min(timeit.repeat(lambda: batch.filter(conditions), number=1, repeat=REPEAT))
+    convert_time = min(timeit.repeat(lambda: batch.to_records(), number=1, repeat=REPEAT))
+    print(f"{ROWS} rows, {len(expected)} matches")
+    print(f"models: {rows_size:.0f} bytes/row, filter {models_time * 1000:.1f} ms")
+    print(f"batch: {batch_size:.0f} bytes/row ({rows_size / batch_size:.1f}x less), "
+          f"filter {batch_time * 1000:.1f} ms ({models_time / batch_time:.1f}x)")
+    print(f"converting the whole batch back to models: {convert_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compares building output rows by dumping and validating every coin again with wrapping the validated coin.
+
+Run with: python -m benchmarks.bench_token_build
+"""
+import timeit
+from typing import List
+
+from benchmarks.bench_conditions import make_rows
+from src.models.instruments.pool import TokenPool
+from src.models.instruments.pump_token import PumpToken
+from src.pump_scraper import PumpScraperToken
+
+ROWS = 10_000
+REPEAT = 5
+
+
+def make_coins(count: int = ROWS) -> List[PumpToken]:
+    return [PumpToken(**row.model_dump(exclude={"pool", "scraped_date"})) for row in make_rows(count)]
+
+
+def revalidate(coins: List[PumpToken], pool: TokenPool) -> List[dict]:
+    return [PumpScraperToken(**coin.model_dump(), pool=pool).model_dump() for coin in coins]
+
+
+def construct(coins: List[PumpToken], pool: TokenPool) -> List[dict]:
+    return [PumpScraperToken.from_coin(coin, pool=pool).model_dump() for coin in coins]
+
+
+def main():
+    coins = make_coins()
+    pool = TokenPool("TOKEN / SOL", 0.001, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0)
+
+    ignored = {"scraped_date"}
+    before = [{k: v for k, v in row.items() if k not in ignored} for row in revalidate(coins, pool)]
+    after = [{k: v for k, v in row.items() if k not in ignored} for row in construct(coins, pool)]
+    assert before == after, "constructed rows disagree with validated rows"
+
+    revalidate_time = min(timeit.repeat(lambda: revalidate(coins, pool), number=1, repeat=REPEAT))
+    construct_time = min(timeit.repeat(lambda: construct(coins, pool), number=1, repeat=REPEAT))
+    print(f"{ROWS} rows, built and serialized once for the dataset")
+    print(f"dump + validate: {revalidate_time / ROWS * 1e6:.1f} us/row")
+    print(f"from_coin: {construct_time / ROWS * 1e6:.1f} us/row ({revalidate_time / construct_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
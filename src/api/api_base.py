@@ -1,11 +1,23 @@
+from functools import lru_cache
 from logging import Logger
 from typing import Type, Any, Dict, List, Optional
 from urllib import parse
 
-import requests
-from pydantic import BaseModel
+import httpx
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
 from src.models.integration.api import ApiError, ApiException
+from src.utils import json_codec
+from src.utils.scripts import RetryBudget, parse_retry_after
+from src.utils.cache import ResponseCache
+from src.utils.concurrency import HostLimiters, SingleFlight
+from src.utils.persistent_cache import PersistentCache
+
+
+@lru_cache(maxsize=None)
+def list_adapter(base_type: Type) -> TypeAdapter:
+    # building an adapter compiles a validator, so share one per type
+    return TypeAdapter(List[base_type])
 
 
 class ModelConverter:
@@ -31,9 +43,43 @@ class ModelConverter:
 
         return results
 
+    def convert_json(self, raw: bytes):
+        """Validates a JSON object straight from the response body."""
+        try:
+            return self.base_type.model_validate_json(raw)
+        except ValidationError:
+            # e.g. an array, let `convert` report the failing item
+            return self.convert(json_codec.loads(raw))
+
+    def convert_list_json(self, raw: bytes):
+        """
+        Validates a JSON array straight from the response body in a single pass.
+
+        When any item fails, the body is decoded and converted item by item so only the failed items are
+        skipped, like `convert_list`. A body holding a single object is converted into a list of one.
+        """
+        try:
+            return list_adapter(self.base_type).validate_json(raw)
+        except ValidationError:
+            data = json_codec.loads(raw)
+            if isinstance(data, list):
+                return self.convert_list(data)
+            return [self.convert(data)]
+
 
 class BaseApi:
-    def __init__(self, logger: Logger, base_url: str):
+    def __init__(
+            self,
+            logger: Logger,
+            base_url: str,
+            max_connections: int = 20,
+            max_keepalive_connections: int = 10,
+            keepalive_expiry: float = 30.0,
+            timeout: float = 30.0,
+            rate_limit: float = 10,
+            rate_burst: int = 20,
+            limiters: Optional[HostLimiters] = None
+    ):
         self.base_url = base_url
         self.logger = logger.getChild(__name__)
         self.headers = {
@@ -55,78 +101,167 @@ class BaseApi:
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
             "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
         )
+        # every instance talks to a single host, so these limits are per host
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout)
+        # shared by every api of the same registry sending requests to the same host
+        self.limiter = (limiters if limiters is not None else HostLimiters()).for_host(
+            parse.urlparse(base_url).hostname,
+            rate=rate_limit,
+            burst=rate_burst,
+            max_concurrency=max_connections
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        # responses are only cached when a subclass configures a cache
+        self.cache: Optional[ResponseCache] = None
+        # snapshots shared across runs, attached by the caller
+        self.store: Optional[PersistentCache] = None
+        self.store_namespace = "responses"
+        self._in_flight = SingleFlight()
+        # drawn from by the `retry` decorated methods of this client only
+        self.retry_budget = RetryBudget()
 
-    @staticmethod
-    def to_query_string(model: BaseModel) -> str:
-        # Convert the Pydantic model to a dictionary
-        model_dict = model.dict()
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client, created lazily on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": self.user_agent},
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=True,
+                follow_redirects=True
+            )
+        return self._client
 
-        # Prepare a list to hold query parameters
-        query_params = []
+    async def close(self):
+        if self.cache is not None:
+            self.logger.info(f"Response cache: {self.cache.stats()}")
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @staticmethod
+    def to_query_params(model: Optional[BaseModel]) -> Dict[str, str]:
+        if model is None:
+            return {}
 
-        for key, value in model_dict.items():
+        query_params = {}
+        for key, value in model.model_dump().items():
+            if value is None:
+                continue
             if isinstance(value, list):
                 # Convert list to CSV string
                 value = ",".join(map(str, value))
-            # URL encode each key and value
-            query_params.append(f"{parse.quote(str(key))}={parse.quote(str(value))}")
+            query_params[key] = str(value)
 
-        # Join all query parameters with '&'
-        return "&".join(query_params)
+        return query_params
+
+    @classmethod
+    def to_query_string(cls, model: BaseModel) -> str:
+        # the same parameters as the ones sent, so a cache key always matches its request
+        query_params = cls.to_query_params(model)
+
+        # URL encode each key and value, joined with '&'
+        return "&".join(f"{parse.quote(key)}={parse.quote(value)}" for key, value in query_params.items())
+
+    async def _request(
+            self,
+            method: str,
+            url: str,
+            params: Optional[BaseModel] = None,
+            content: Optional[str] = None
+    ) -> bytes:
+        async with self.limiter.slot():
+            response = await self.client.request(
+                method,
+                url,
+                params=self.to_query_params(params),
+                headers=self.headers,
+                content=content
+            )
+            # Output response status and content
+            self.logger.debug(f"{method} {response.url} ({response.http_version}): {response.status_code}, {len(response.content)} bytes")
+            if response.status_code == 200:
+                # decoded and validated in one pass by the caller
+                return response.content
+            else:
+                raise ApiException(
+                    response.status_code,
+                    message=(
+                        f"Error retrieving data: {response.status_code}"
+                        f"(url={url}, params={self.to_query_string(params) if params else ''}"
+                    ),
+                    response_text=response.text,
+                    retry_after=parse_retry_after(response.headers.get("retry-after"))
+                )
 
     async def _post_request(
             self, url: str,
             params: Optional[BaseModel] = None,
             data: Optional[BaseModel] = None
-    ) -> Dict | List[Dict] | ApiError:
-        # Initialize the session and set the user-agent
-        session = requests.Session()
-        session.headers.update({"User-Agent": self.user_agent})
-        # Make the request
-        response = session.post(url, params=params, headers=self.headers, data=data.model_dump_json() if data else None)
-        # Output response status and content
-        self.logger.debug("Params:", params.json())
-        self.logger.debug("Status Code:", response.status_code)
-        self.logger.debug("Response Content:", len(response.text))
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise ApiException(
-                response.status_code,
-                message=(
-                    f"Error retrieving data: {response.status_code}"
-                    f"(url={url}, params={self.to_query_string(params)}"
-                ),
-                response_text=response.text
-            )
+    ) -> bytes:
+        return await self._request("POST", url, params=params, content=data.model_dump_json() if data else None)
 
-    async def _get_request(self, url: str, params: BaseModel) -> Dict | List[Dict] | ApiError:
-        # Initialize the session and set the user-agent
-        session = requests.Session()
-        session.headers.update({"User-Agent": self.user_agent})
-        # Make the request
-        response = session.get(url, params=params, headers=self.headers)
-        # Output response status and content
-        self.logger.debug("Params:", params.json())
-        self.logger.debug("Status Code:", response.status_code)
-        self.logger.debug("Response Content:", len(response.text))
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise ApiException(
-                response.status_code,
-                message=(
-                    f"Error retrieving data: {response.status_code}"
-                    f"(url={url}, params={self.to_query_string(params)}"
-                ),
-                response_text=response.text
-            )
+    async def _get_request(self, url: str, params: BaseModel) -> bytes:
+        return await self._request("GET", url, params=params)
 
-    async def _get_list(self, url: str, params: BaseModel, return_type: Type, path: str = None) -> Any | ApiError:
+    async def _fetch(self, url: str, params: Optional[BaseModel], use_cache: bool = True) -> bytes:
+        """Returns the raw response body, from the caches when possible."""
+        key = ResponseCache.key(url, self.to_query_string(params) if params else "")
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.logger.debug(f"Cache hit: {key}")
+                return cached
+
+        # identical requests already in flight share a single network call, a call bypassing the caches
+        # never joins one that may be answered from them
+        return await self._in_flight.do((key, use_cache), lambda: self._load(key, url, params, use_cache))
+
+    async def _load(self, key: str, url: str, params: Optional[BaseModel], use_cache: bool) -> bytes:
+        if use_cache and self.store is not None:
+            stored = await self.store.get(self.store_namespace, key)
+            if stored is not None:
+                self.logger.debug(f"Persistent cache hit: {key}")
+                # snapshots hold the body as text, older ones the decoded document
+                result = stored.encode() if isinstance(stored, str) else json_codec.dumps(stored)
+                if self.cache is not None:
+                    self.cache.put(key, result, size=len(result))
+                return result
+
+        result = await self._get_request(url, params)
+        if use_cache and self.cache is not None:
+            self.cache.put(key, result, size=len(result))
+        if use_cache and self.store is not None:
+            await self.store.put(self.store_namespace, key, result.decode())
+        return result
+
+    async def _get_list(
+            self,
+            url: str,
+            params: BaseModel,
+            return_type: Type,
+            path: str = None,
+            use_cache: bool = True
+    ) -> Any | ApiError:
         try:
             converter = ModelConverter(base_type=return_type, logger=self.logger)
-            result = await self._get_request(url, params=params)
-            data = result[path] if path else result
+            raw = await self._fetch(url, params, use_cache=use_cache)
+            if not path:
+                return converter.convert_list_json(raw)
+
+            data = json_codec.loads(raw)[path]
             if isinstance(data, list):
                 return converter.convert_list(data)
             else:
@@ -138,10 +273,24 @@ class BaseApi:
             self.logger.error(e)
             raise ApiException(status_code=500, message="Unknown server error", cause=e)
 
-    async def _get_single(self, url: str, params: BaseModel, return_type: Type, path: str = None) -> Any | ApiError:
+    async def _get_single(
+            self,
+            url: str,
+            params: BaseModel,
+            return_type: Type,
+            path: str = None,
+            use_cache: bool = True
+    ) -> Any | ApiError:
         try:
             converter = ModelConverter(base_type=return_type, logger=self.logger)
-            result = await self._get_request(url, params)
+            raw = await self._fetch(url, params, use_cache=use_cache)
+            if not path and raw.lstrip()[:1] == b"{":
+                try:
+                    return return_type.model_validate_json(raw)
+                except ValidationError:
+                    pass  # decoded below, e.g. an empty object means there is no data
+
+            result = json_codec.loads(raw)
             data = result[path] if path else result
             if data and isinstance(data, list):
                 data = data[0]
@@ -160,8 +309,8 @@ class BaseApi:
     async def _post(self, url: str, params: Optional[BaseModel], data: BaseModel, return_type: Type) -> Any | ApiError:
         try:
             converter = ModelConverter(base_type=return_type, logger=self.logger)
-            result = await self._post_request(url, params, data=data)
-            return converter.convert(result)
+            raw = await self._post_request(url, params, data=data)
+            return converter.convert_json(raw)
         except ApiException as ae:
             self.logger.error(ae)
             raise
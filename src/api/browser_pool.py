@@ -0,0 +1,121 @@
+import asyncio
+from contextlib import asynccontextmanager
+from logging import Logger
+from typing import AsyncIterator, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
+
+
+class PooledPage:
+    def __init__(self, context: Optional[BrowserContext] = None, page: Optional[Page] = None):
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+    @property
+    def is_healthy(self) -> bool:
+        return self.page is not None and not self.page.is_closed()
+
+    async def close(self):
+        if self.context is not None:
+            try:
+                await self.context.close()
+            except Exception:
+                pass  # the browser may already be gone
+        self.context = None
+        self.page = None
+
+
+class BrowserPool:
+    """
+    A single headless Chromium process with `size` pre-warmed pages that are leased out per request.
+
+    Pages are recycled after `max_uses` leases or whenever a request on them fails, and the browser is
+    relaunched if it crashes. The pool is started lazily on the first lease and must be closed with `close()`.
+    """
+
+    def __init__(self, logger: Logger, user_agent: str, size: int = 4, max_uses: int = 50, headless: bool = True):
+        self.logger = logger.getChild(__name__)
+        self.user_agent = user_agent
+        self.size = max(size, 1)
+        self.max_uses = max_uses
+        self.headless = headless
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._pages: asyncio.Queue[PooledPage] = asyncio.Queue()
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_started(self) -> bool:
+        return self._browser is not None
+
+    async def start(self):
+        async with self._lock:
+            if self._browser is not None:
+                return
+
+            self.logger.debug(f"Starting browser pool with {self.size} pages")
+            self._playwright = await async_playwright().start()
+            await self._launch()
+            for _ in range(self.size):
+                # slots start empty and are warmed in parallel
+                self._pages.put_nowait(PooledPage())
+        await asyncio.gather(*(self._warm() for _ in range(self.size)))
+
+    async def _warm(self):
+        pooled = await self._pages.get()
+        try:
+            await self._recycle(pooled)
+        except Exception as e:
+            self.logger.warning(f"Failed to warm browser page: {e}")
+        finally:
+            self._pages.put_nowait(pooled)
+
+    async def _launch(self):
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+
+    async def _recycle(self, pooled: PooledPage):
+        await pooled.close()
+        if self._browser is None or not self._browser.is_connected():
+            self.logger.warning("Browser disconnected, relaunching")
+            await self._launch()
+
+        pooled.context = await self._browser.new_context(user_agent=self.user_agent)
+        pooled.page = await pooled.context.new_page()
+        pooled.uses = 0
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[PooledPage]:
+        if not self.is_started:
+            await self.start()
+
+        pooled = await self._pages.get()
+        failed = False
+        try:
+            if not pooled.is_healthy:
+                await self._recycle(pooled)
+            yield pooled
+        except Exception:
+            failed = True
+            raise
+        finally:
+            pooled.uses += 1
+            if failed or pooled.uses >= self.max_uses or not pooled.is_healthy:
+                # close now so the next lease starts from a fresh context
+                await pooled.close()
+            self._pages.put_nowait(pooled)
+
+    async def close(self):
+        while not self._pages.empty():
+            await self._pages.get_nowait().close()
+
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                self.logger.debug(f"Failed to close browser: {e}")
+            self._browser = None
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
@@ -1,15 +1,18 @@
+import asyncio
+import math
 from datetime import datetime
 from enum import Enum
 from logging import Logger
-from typing import List, Optional
+from typing import AsyncIterator, Callable, List, Optional, Set, Tuple
 
 from pydantic import Field
 
 from src.api.api_base import BaseApi
-from src.models.integration.api import ApiError, ApiModel
+from src.models.integration.api import ApiError, ApiException, ApiModel
 from src.models.instruments.pump_token import PumpToken
 from src.models.portfolio.trade import Trade
-from src.utils.scripts import stagger, days_ago
+from src.utils.concurrency import HostLimiters
+from src.utils.scripts import days_ago, retry
 
 
 class OrderByDirection(Enum):
@@ -43,9 +46,27 @@ class GetTradesFilter(BasePaginationFilter):
     minimumSize: Optional[int] = 50000000
 
 
+# returned for a page that was never requested because an earlier page already ended the pagination
+PAGE_SKIPPED = object()
+
+
 class PumpApi(BaseApi):
-    def __init__(self, logger: Logger, base_url: str = "https://frontend-api-v3.pump.fun"):
-        super().__init__(base_url=base_url, logger=logger)
+    def __init__(
+            self,
+            logger: Logger,
+            base_url: str = "https://frontend-api-v3.pump.fun",
+            rate_limit: float = 10,
+            rate_burst: int = 20,
+            limiters: Optional[HostLimiters] = None
+    ):
+        super().__init__(
+            base_url=base_url,
+            logger=logger,
+            rate_limit=rate_limit,
+            rate_burst=rate_burst,
+            limiters=limiters
+        )
+        self.store_namespace = "coins"
         self.headers = {
             "authority": "frontend-api-v3.pump.fun",
             "accept": "*/*",
@@ -62,43 +83,143 @@ class PumpApi(BaseApi):
             "sec-fetch-site": "same-site",
         }
 
-    async def get_tokens(self, **kwargs) -> List[PumpToken] | ApiError:
-        # https://frontend-api-v3.pump.fun/coins?offset=0&limit=100&sort=created_timestamp&includeNsfw=false&order=DESC
+    async def get_tokens(
+            self,
+            stop_when: Optional[Callable[[PumpToken], bool]] = None,
+            concurrency: int = 1,
+            **kwargs
+    ) -> List[PumpToken] | ApiError:
+        """
+        Pages through `/coins` until `limit` coins are collected or the feed is exhausted.
+
+        `stop_when` is called with the last coin of each page, once it returns True no further page is
+        requested (e.g. the sort order proves that no later coin can pass the filters). Up to `concurrency`
+        pages are downloaded at once.
+        """
         coins: List[PumpToken] = []
+        async for page in self.iter_tokens(stop_when=stop_when, concurrency=concurrency, **kwargs):
+            coins.extend(page)
+
+        return coins
+
+    async def iter_tokens(
+            self,
+            stop_when: Optional[Callable[[PumpToken], bool]] = None,
+            concurrency: int = 1,
+            **kwargs
+    ) -> AsyncIterator[List[PumpToken]]:
+        """Same as `get_tokens` but yields every page, in offset order, as soon as it is available."""
+        # https://frontend-api-v3.pump.fun/coins?offset=0&limit=100&sort=created_timestamp&includeNsfw=false&order=DESC
+        count = 0
+        seen: Set[str] = set()
         url = f"{self.base_url}/coins"
         params = GetCoinsFilter(**kwargs)
+        stop_when = self._stop_condition(params, stop_when)
 
         counter = 0
         limit = min(params.limit, 50)
-        while len(coins) < params.limit:
-            filters = PumpApiCoinsFilter(**{**kwargs, 'limit': limit, 'offset': counter * limit})
-            result: List[PumpToken] = await self._get_list(url, params=filters, return_type=PumpToken)
+        semaphore = asyncio.Semaphore(max(int(concurrency or 1), 1))
+        exhausted = asyncio.Event()
+        while count < params.limit and not exhausted.is_set():
+            # offsets are known up front, so dispatch every page still needed at once
+            pages = max(math.ceil((params.limit - count) / limit), 1)
+            offsets = [params.offset + (counter + i) * limit for i in range(pages)]
+            counter += pages
 
-            # exit if there is no data
-            if not result:
-                break
+            tasks = [
+                asyncio.create_task(
+                    self._get_page(url, semaphore, exhausted, stop_when, **{**kwargs, 'limit': limit, 'offset': o})
+                )
+                for o in offsets
+            ]
+            try:
+                # reassemble in offset order, stopping at the first empty page
+                for task in tasks:
+                    result = await task
 
-            # apply date range filter
-            if params.max_created_date or params.min_created_date:
-                filtered = list(result)
-                if params.max_created_date:
-                    filtered = [c for c in filtered if c.created_timestamp <= params.max_created_date]
-                if params.min_created_date:
-                    filtered = [c for c in filtered if c.created_timestamp >= params.min_created_date]
-            else:
-                filtered = result
+                    # pages start in offset order, so the page that ended the pagination came before this one
+                    if result is PAGE_SKIPPED:
+                        break
 
-            # apply graduated filter
-            if params.is_graduated is not None:
-                filtered = [c for c in result if c.complete]
+                    # exit if there is no data
+                    if not result:
+                        exhausted.set()
+                        break
 
-            counter += 1
+                    # apply date range filter
+                    filtered = result
+                    if params.max_created_date:
+                        filtered = [c for c in filtered if c.created_timestamp <= params.max_created_date]
+                    if params.min_created_date:
+                        filtered = [c for c in filtered if c.created_timestamp >= params.min_created_date]
 
-            # save results and stagger
-            coins.extend(filtered)
-            self.logger.debug(f"{len(coins)} total, last={len(filtered)}, unfiltered={len(result)}, last={result[-1].created_timestamp if result else None}")
+                    # apply graduated filter
+                    if params.is_graduated is not None:
+                        filtered = [c for c in filtered if c.complete == params.is_graduated]
 
-        return coins
+                    # the live feed shifts between pages, so drop coins already returned
+                    filtered = [c for c in filtered if c.mint not in seen][:params.limit - count]
+                    seen.update(c.mint for c in filtered)
+
+                    count += len(filtered)
+                    self.logger.debug(f"{count} total, last={len(filtered)}, unfiltered={len(result)}, last={result[-1].created_timestamp}")
+                    if filtered:
+                        yield filtered
+
+                    # drop the following pages even if they were already fetched
+                    if count >= params.limit:
+                        break
+                    if stop_when(result[-1]):
+                        self.logger.debug(f"Stopping pagination after {result[-1].mint}, later pages cannot match")
+                        exhausted.set()
+                        break
+            finally:
+                # pages nobody will read, e.g. after a failure or when the consumer stops early
+                for task in tasks:
+                    task.cancel()
+
+    @staticmethod
+    def _stop_condition(
+            params: GetCoinsFilter,
+            stop_when: Optional[Callable[[PumpToken], bool]]
+    ) -> Callable[[PumpToken], bool]:
+        descending = params.order == OrderByDirection.DESC.value
+        min_created_date = params.min_created_date if params.sort == "created_timestamp" and descending else None
+
+        def should_stop(coin: PumpToken) -> bool:
+            try:
+                if min_created_date and coin.created_timestamp < min_created_date:
+                    return True
+                return bool(stop_when and stop_when(coin))
+            except TypeError:
+                return False  # missing sort values prove nothing
+
+        return should_stop
+
+    async def _get_page(
+            self,
+            url: str,
+            semaphore: asyncio.Semaphore,
+            exhausted: asyncio.Event,
+            stop_when: Callable[[PumpToken], bool],
+            **kwargs
+    ) -> List[PumpToken] | object:
+        async with semaphore:
+            # stop scheduling further pages once an empty or final page is seen, only checked before the
+            # first attempt so a retried page is never mistaken for a skipped one
+            if exhausted.is_set():
+                return PAGE_SKIPPED
+
+            result = await self._get_coins_page(url, **kwargs)
+            if not result or stop_when(result[-1]):
+                exhausted.set()
+
+            return result
+
+    @retry(ApiException, tries=3, delay=1, backoff=2, deadline=60)
+    async def _get_coins_page(self, url: str, **kwargs) -> List[PumpToken]:
+        filters = PumpApiCoinsFilter(**kwargs)
+        return await self._get_list(url, params=filters, return_type=PumpToken)
 
     async def search_token(self, term: str) -> PumpToken | ApiError:
         # https://frontend-api-v3.pump.fun/coins/search?offset=0&limit=50&sort=market_cap&includeNsfw=false&order=DESC&searchTerm=FAFO&type=exact
@@ -123,3 +244,47 @@ class PumpApi(BaseApi):
         params = GetTradesFilter(**kwargs)
 
         return await self._get_list(url, params=params, return_type=Trade)
+
+    async def iter_trades(
+            self,
+            coin: str,
+            after: Optional[Tuple[int, int]] = None,
+            max_trades: Optional[int] = None,
+            **kwargs
+    ) -> AsyncIterator[List[Trade]]:
+        """
+        Pages through the trades of a coin, newest first, yielding each page of trades not seen yet.
+
+        `after` is the (slot, tx_index) of the newest trade returned by a previous run, paging stops at the
+        first trade at or before it.
+        """
+        params = GetTradesFilter(**kwargs)
+        limit = min(params.limit, 200)
+        seen: Set[str] = set()
+        count = 0
+        offset = params.offset
+        while max_trades is None or count < max_trades:
+            trades = await self._get_trades_page(coin, **{**kwargs, "offset": offset, "limit": limit})
+            if not trades:
+                break
+            offset += limit
+
+            # the feed shifts while paging, so drop the trades already returned
+            fresh = [t for t in trades if t.signature not in seen and (after is None or (t.slot, t.tx_index) > after)]
+            seen.update(t.signature for t in fresh)
+            if max_trades is not None:
+                fresh = fresh[:max_trades - count]
+            count += len(fresh)
+            if fresh:
+                yield fresh
+
+            reached = after is not None and (trades[-1].slot, trades[-1].tx_index) <= after
+            if reached or len(trades) < limit:
+                break
+
+    @retry(ApiException, tries=3, delay=1, backoff=2, deadline=60)
+    async def _get_trades_page(self, coin: str, **kwargs) -> List[Trade]:
+        # trades move every second, never serve them from a cache
+        url = f"{self.base_url}/trades/all/{coin}"
+        params = GetTradesFilter(**kwargs)
+        return await self._get_list(url, params=params, return_type=Trade, use_cache=False)
@@ -1,16 +1,16 @@
-import hashlib
-import json
 import random
-import time
-from functools import lru_cache
 from logging import Logger
-from typing import Any, Dict, List, Optional
+from typing import Dict, Optional
 
-from playwright.async_api import async_playwright
 from pydantic import BaseModel
 
 from src.api.api_base import BaseApi
-from src.models.integration.api import ApiError, ApiException
+from src.api.browser_pool import BrowserPool, PooledPage
+from src.models.integration.api import ApiException
+from src.utils import json_codec
+from src.utils.scripts import parse_retry_after
+from src.utils.cache import ResponseCache
+from src.utils.concurrency import HostLimiters
 
 PROXIES = [
     "https://150.136.247.129:1080",
@@ -24,20 +24,27 @@ def get_random_proxy():
     return random.choice(PROXIES)
 
 
-@lru_cache(maxsize=100)
-def cache_response(url: str, params: str):
-    return None  # Placeholder for caching logic
-
-
-def cache_result(url: str, params: str, data: Any, expiry: int = 300):
-    cache_key = hashlib.md5(f"{url}{params}".encode()).hexdigest()
-    cache_response.cache_clear()
-    cache_response.cache_response[cache_key] = (time.time(), data, expiry)
-
-
 class BaseWebApi(BaseApi):
-    def __init__(self, logger: Logger, base_url: str):
-        super().__init__(logger=logger, base_url=base_url)
+    def __init__(
+            self,
+            logger: Logger,
+            base_url: str,
+            browser_pages: int = 4,
+            max_page_uses: int = 50,
+            cache_ttl: float = 30,
+            cache_ttls: Optional[Dict[str, float]] = None,
+            rate_limit: float = 2,
+            rate_burst: int = 5,
+            limiters: Optional[HostLimiters] = None
+    ):
+        super().__init__(
+            logger=logger,
+            base_url=base_url,
+            rate_limit=rate_limit,
+            rate_burst=rate_burst,
+            limiters=limiters
+        )
+        self.cache = ResponseCache(ttl=cache_ttl, ttls=cache_ttls)
         self.headers = {
             "accept": "*/*",
             "accept-encoding": "gzip, deflate, br, zstd",
@@ -46,68 +53,102 @@ class BaseWebApi(BaseApi):
             "sec-fetch-mode": "cors",
             "sec-fetch-site": "same-site",
         }
+        self.browser_pool = BrowserPool(
+            logger=self.logger,
+            user_agent=self.user_agent,
+            size=browser_pages,
+            max_uses=max_page_uses
+        )
+        # set once the browser has passed the challenge and its cookies are in `self.client`
+        self.has_clearance = False
+
+    async def close(self):
+        await self.browser_pool.close()
+        await super().close()
 
     async def _post_request(
             self, url: str,
             params: Optional[BaseModel] = None,
             method: str = "POST",
             data: Optional[Dict] = None
-    ) -> Dict | List[Dict] | ApiError:
+    ) -> bytes:
         proxy = get_random_proxy()
-        async with async_playwright() as p:
-            # browser = await p.chromium.launch(headless=True, proxy={"server": proxy})
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(user_agent=self.user_agent)
-            page = await context.new_page()
-
+        async with self.limiter.slot(), self.browser_pool.lease() as pooled:
             query_params = self.to_query_string(params)
             full_url = f"{url}?{query_params}"
 
             self.logger.debug(f"{method} {full_url} via {proxy}")
-            await page.evaluate(
-                "(url, headers, body) => fetch(url, { method: 'POST', headers, body: JSON.stringify(body) }).then(res => res.text())",
-                full_url, self.headers, data
+            response = await pooled.page.evaluate(
+                "([url, headers, body]) => fetch(url, { method: 'POST', headers, body: JSON.stringify(body) }).then(res => res.text())",
+                [full_url, self.headers, data]
             )
 
-            response = await page.evaluate("() => document.body.innerText")
-            await browser.close()
-
-            try:
-                parsed_response = json.loads(response)
-                # cache_result(url, json.dumps(params.dict() if params else {}), parsed_response)
-                return parsed_response
-            except json.JSONDecodeError:
-                raise ApiException(500, f"Invalid JSON from {url}", response)
+        if not json_codec.is_json_document(response):
+            raise ApiException(500, f"Invalid JSON from {url}", response)
+        return response.encode()
 
     async def _get_request(
             self,
             url: str,
             params: Optional[BaseModel] = None,
             data: Optional[Dict] = None
-    ) -> Dict | List[Dict] | ApiError:
-        # cached = cache_response(url, json.dumps(params.dict() if params else {}))
-        # if cached:
-        #     return cached
+    ) -> bytes:
+        async with self.limiter.slot():
+            if self.has_clearance:
+                response = await self._http_get_request(url, params)
+                if response is not None:
+                    return response
+                self.logger.debug(f"Challenge detected for {url}, falling back to browser")
+
+            return await self._browser_get_request(url, params)
+
+    async def _http_get_request(self, url: str, params: Optional[BaseModel] = None) -> Optional[bytes]:
+        """Plain HTTP request reusing the browser cookies, returns None when a challenge page is served."""
+        response = await self.client.get(
+            url,
+            params=self.to_query_params(params),
+            headers={**self.headers, "User-Agent": self.user_agent}
+        )
+        self.logger.debug(f"GET {response.url} ({response.http_version}): {response.status_code}, {len(response.content)} bytes")
+
+        is_json = "json" in response.headers.get("content-type", "")
+        if response.status_code in (403, 503) or (response.status_code == 200 and not is_json):
+            self.has_clearance = False
+            return None
+
+        if response.status_code != 200:
+            raise ApiException(
+                response.status_code,
+                message=f"Error retrieving data: {response.status_code}(url={url}, params={self.to_query_string(params)}",
+                response_text=response.text,
+                retry_after=parse_retry_after(response.headers.get("retry-after"))
+            )
 
-        proxy = get_random_proxy()
-        async with async_playwright() as p:
-            # browser = await p.chromium.launch(headless=True, proxy={"server": proxy})
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(user_agent=self.user_agent)
-            page = await context.new_page()
+        if not json_codec.is_json_document(response.content):
+            self.has_clearance = False
+            return None
+        return response.content
 
+    async def _browser_get_request(self, url: str, params: Optional[BaseModel] = None) -> bytes:
+        proxy = get_random_proxy()
+        async with self.browser_pool.lease() as pooled:
             query_params = self.to_query_string(params)
             full_url = f"{url}?{query_params}"
 
             self.logger.debug(f"GET {full_url} via {proxy}")
-            await page.goto(full_url, wait_until="networkidle")
+            await pooled.page.goto(full_url, wait_until="networkidle")
 
-            response = await page.evaluate("() => document.body.innerText")
-            await browser.close()
+            response = await pooled.page.evaluate("() => document.body.innerText")
 
-            try:
-                parsed_response = json.loads(response)
-                # cache_result(url, json.dumps(params.dict() if params else {}), parsed_response)
-                return parsed_response
-            except json.JSONDecodeError:
+            if not json_codec.is_json_document(response):
                 raise ApiException(500, f"Invalid JSON from {url}", response)
+
+            # the page got through, so reuse its clearance for plain HTTP requests
+            await self._harvest_clearance(pooled)
+            return response.encode()
+
+    async def _harvest_clearance(self, pooled: PooledPage):
+        self.user_agent = await pooled.page.evaluate("() => navigator.userAgent")
+        for cookie in await pooled.context.cookies():
+            self.client.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+        self.has_clearance = True
@@ -1,12 +1,25 @@
 # Apify SDK - A toolkit for building Apify Actors. Read more at:
 # https://docs.apify.com/sdk/python
-from typing import List
+import os
+from typing import AsyncIterator, List, Optional
 
 from apify import Actor
 
+from src.api.pump import OrderByDirection
 from src.pump_scraper import PumpScraper, PumpScraperToken
-from src.utils.condition import Condition, OperatorEnum, ConditionConstant
+from src.utils.changes import ChangeTracker, OutputMode
+from src.utils.condition import Condition, ConditionBase, OperatorEnum, ConditionConstant
+from src.utils.persistent_cache import CacheBackend, PersistentCache, KeyValueStoreBackend, LocalDirectoryBackend
 from src.utils.scripts import parse_date
+from src.utils.sink import DatasetWriter
+from src.utils.sqlite_store import SqliteStore
+from src.utils.watermark import WATERMARK_FIELDS, TradeCursors, Watermark
+
+# input only used to configure the run, never applied as a filter
+RUN_ARGS = {
+    "persistent_cache_max_age", "push_batch_size", "push_flush_interval", "sqlite_path", "sqlite_query_only",
+    "delta_mode", "output_mode", "mode", "mints", "max_trades_per_mint", "trade_concurrency"
+}
 
 
 def get_transforms(is_mkt_cap_usd: bool = False):
@@ -18,8 +31,10 @@ def get_transforms(is_mkt_cap_usd: bool = False):
         "order_by": "sort",
         "order_by_direction": "order",
         "is_nsfw": "includeNsfw",
+        "page_concurrency": "concurrency",
         # custom
         "include_pricing": None,
+        "pricing_concurrency": None,
         # applied with conditions
         "is_graduated": "complete",
         "min_created_timestamp": "created_timestamp",
@@ -97,6 +112,38 @@ async def build_filters(exclude_fields: List[str] = None):
     return conditions
 
 
+async def build_backend() -> CacheBackend:
+    # a local directory keeps development runs away from the platform store
+    cache_dir = os.environ.get("PUMP_SCRAPER_CACHE_DIR")
+    if cache_dir:
+        return LocalDirectoryBackend(cache_dir)
+    return KeyValueStoreBackend(await Actor.open_key_value_store(name="pump-scraper-cache"))
+
+
+async def build_store() -> Optional[PersistentCache]:
+    args = await Actor.get_input() or {}
+    max_age = args.get("persistent_cache_max_age")
+    if not max_age:
+        return None
+
+    return PersistentCache(backend=await build_backend(), logger=Actor.log, max_age=max_age)
+
+
+async def build_watermark(params: dict) -> Optional[Watermark]:
+    args = await Actor.get_input() or {}
+    if not args.get("delta_mode"):
+        return None
+
+    sort = params.get("sort", "created_timestamp")
+    if sort not in WATERMARK_FIELDS or params.get("order") == OrderByDirection.ASC.value or params.get("term"):
+        Actor.log.warning(f"Delta mode needs a descending sort on one of {sorted(WATERMARK_FIELDS)} and no search term, ignoring it")
+        return None
+
+    watermark = await Watermark.load(await build_backend(), sort, Actor.log)
+    Actor.log.info(f"Delta mode: returning coins with {sort} past {watermark.value}")
+    return watermark
+
+
 async def main() -> None:
     """Main entry point for the Apify Actor.
 
@@ -105,19 +152,131 @@ async def main() -> None:
     the field of web scraping significantly.
     """
     async with Actor:
-        client = PumpScraper(logger=Actor.log)
+        store = await build_store()
+        try:
+            await scrape(store)
+        finally:
+            if store is not None:
+                await store.flush()
+
+
+async def query_history(
+        history: SqliteStore[PumpScraperToken],
+        conditions: ConditionBase[PumpScraperToken],
+        batch_size: int,
+        **params
+) -> AsyncIterator[List[PumpScraperToken]]:
+    """Answers the filters from the tokens stored by previous runs instead of scraping."""
+    results = await history.query(
+        conditions=conditions,
+        sort=params.get("sort", "created_timestamp"),
+        descending=params.get("order", OrderByDirection.DESC.value) == OrderByDirection.DESC.value,
+        offset=params.get("offset") or 0,
+        limit=params.get("limit"),
+    )
+    for i in range(0, len(results), batch_size):
+        yield results[i:i + batch_size]
+
+
+async def scrape_trades(
+        client: PumpScraper,
+        writer: DatasetWriter,
+        conditions: ConditionBase[PumpScraperToken],
+        **params
+) -> None:
+    args = await Actor.get_input() or {}
+    mints = args.get("mints") or []
+    if not mints:
+        # without a list, fetch the trades of the coins matching the filters
+        mints = [t.mint for t in await client.get_results(conditions=conditions, **params)]
+
+    backend = await build_backend()
+    cursors = TradeCursors(logger=Actor.log)
+    await cursors.load(backend)
+    Actor.log.info(f"Fetching the trades of {len(mints)} mints")
+    try:
+        async with writer:
+            async for trades in client.iter_trades(
+                    mints,
+                    cursors=cursors,
+                    concurrency=args.get("trade_concurrency") or 4,
+                    max_trades=args.get("max_trades_per_mint")
+            ):
+                await writer.write([t.model_dump() for t in trades])
+    finally:
+        # mints whose trades were all pushed start after them next time, unless some rows never got pushed
+        if writer.pending:
+            Actor.log.warning(f"{writer.pending} trades were not pushed, keeping the previous trade cursors")
+        else:
+            await cursors.save(backend)
+    Actor.log.info(f"Pushed {writer.written} trades")
+
+
+async def scrape(store: Optional[PersistentCache] = None) -> None:
+    args = await Actor.get_input() or {}
+    history = SqliteStore(args["sqlite_path"], PumpScraperToken, Actor.log) if args.get("sqlite_path") else None
+    query_only = bool(args.get("sqlite_query_only"))
+    if query_only and history is None:
+        raise ValueError("sqlite_query_only requires sqlite_path")
+
+    async with PumpScraper(logger=Actor.log, store=store) as client:
         # Retrieve the input object for the Actor. The structure of input is defined in input_schema.json.
         params = await build_params()
-        conditions = await build_filters(exclude_fields=client.pump_args.union(client.price_args))
-        # Fetch the HTML content of the page, following redirects if necessary.
-        Actor.log.info(f'Sending a request with params {params}')
-        results = await client.get_results(**params)
-        if results:
-            Actor.log.debug(f"Filtering results by: {conditions.to_sql(results[0])}")
-            filtered: List[PumpScraperToken] = list(filter(conditions.evaluate, results))
-            Actor.log.info(f"Filtered results ({type(filtered)}) {len(filtered)} - {filtered[0] if filtered else None}")
-            Actor.log.debug(f"Filtered results ({type(filtered)}) {filtered}")
-            # Save the extracted headings to the dataset, which is a table-like storage.
-            await Actor.push_data([f.model_dump() for f in filtered])
+        conditions = await build_filters(exclude_fields=client.pump_args | client.price_args | RUN_ARGS)
+        writer = DatasetWriter(
+            push=Actor.push_data,
+            logger=Actor.log,
+            batch_size=args.get("push_batch_size") or 200,
+            flush_interval=args.get("push_flush_interval") or 10,
+        )
+        if args.get("mode") == "trades":
+            await scrape_trades(client, writer, conditions, **params)
+            return
+
+        watermark = None
+        if query_only:
+            Actor.log.info(f'Querying {history.path} with params {params}')
+            batches = query_history(history, conditions, writer.batch_size, **params)
         else:
-            await Actor.push_data([r.model_dump() for r in results])
+            watermark = await build_watermark(params)
+            Actor.log.info(f'Sending a request with params {params}')
+            batches = client.iter_batches(conditions=conditions, watermark=watermark, **params)
+
+        output_mode = OutputMode(args.get("output_mode") or OutputMode.ALL.value)
+        tracker = None
+        if output_mode != OutputMode.ALL:
+            tracker = ChangeTracker(logger=Actor.log)
+            await tracker.load(await build_backend())
+
+        # rows are saved to the dataset as pages are scraped, a failing run keeps what was pushed
+        try:
+            async with writer:
+                first: Optional[PumpScraperToken] = None
+                async for batch in batches:
+                    first = first or batch[0]
+                    Actor.log.debug(f"Filtered batch of {len(batch)} tokens")
+                    if history is not None and not query_only:
+                        await history.write(batch)
+                    if tracker is not None:
+                        await writer.write(tracker.changes(batch, output_mode))
+                    else:
+                        await writer.write([r.model_dump() for r in batch])
+        finally:
+            if history is not None:
+                history.close()
+            # the tokens already pushed are part of the snapshot even when the run fails, unless some rows
+            # never got pushed: they would count as unchanged next time
+            if tracker is not None:
+                if writer.pending:
+                    Actor.log.warning(f"{writer.pending} rows were not pushed, keeping the previous token snapshots")
+                else:
+                    await tracker.save(await build_backend())
+        Actor.log.info(f"Filtered results {writer.written} - {first}")
+
+        # only a run that saw every coin past the mark may move it, otherwise the coins it skipped would never be returned
+        if watermark is not None:
+            if watermark.advance():
+                await watermark.save(await build_backend())
+                Actor.log.info(f"Delta mode: {watermark.observed} coins seen, next run starts after {watermark.value}")
+            else:
+                Actor.log.warning(f"Delta mode: the limit was reached before {watermark.value}, keeping the mark")
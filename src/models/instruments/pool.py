@@ -50,12 +50,37 @@ class HighLowPriceData(ApiModel):
     low_price_timestamp_24h: Optional[datetime] = None
 
 
-class Attributes(ApiModel):
-    address: Optional[str] = None
+class PriceAttributes(ApiModel):
+    """The pool attributes needed to price a token."""
     name: Optional[str] = None
+    price_in_usd: Optional[float] = None
+    price_percent_change: Optional[str] = None
+    price_percent_changes: Dict[str, str] = None
+
+    @property
+    def price_percent_change_value(self):
+        return convert_percentage(self.price_percent_change)
+
+    def price_percent_change_from(self, field: str):
+        return convert_percentage(self.price_percent_changes.get(field))
+
+    def get_token_pool(self) -> "TokenPool":
+        return TokenPool(
+            pool_name=self.name,
+            price=self.price_in_usd,
+            price_change_5m=self.price_percent_change_from(field='last_5m'),
+            price_change_15m=self.price_percent_change_from(field='last_15m'),
+            price_change_30m=self.price_percent_change_from(field='last_30m'),
+            price_change_1h=self.price_percent_change_from(field='last_1h'),
+            price_change_6h=self.price_percent_change_from(field='last_6h'),
+            price_change_24h=self.price_percent_change_value
+        )
+
+
+class Attributes(PriceAttributes):
+    address: Optional[str] = None
     fully_diluted_valuation: Optional[float] = None
     base_token_id: Optional[str] = None
-    price_in_usd: Optional[float] = None
     price_in_target_token: Optional[float] = None
     reserve_in_usd: Optional[float] = None
     reserve_threshold_met: Optional[bool] = None
@@ -70,8 +95,6 @@ class Attributes(ApiModel):
     swap_count_24h: Optional[int] = None
     swap_url: Optional[str] = None
     sentiment_votes: Optional[SentimentVotes] = None
-    price_percent_change: Optional[str] = None
-    price_percent_changes: Dict[str, str] = None
     historical_data: Dict[str, HistoricalDataEntry]
     locked_liquidity: Optional[float] = None
     security_indicators: List = []
@@ -85,13 +108,6 @@ class Attributes(ApiModel):
     is_stale_pool: Optional[bool] = None
     is_pool_address_explorable: Optional[bool] = None
 
-    @property
-    def price_percent_change_value(self):
-        return convert_percentage(self.price_percent_change)
-
-    def price_percent_change_from(self, field: str):
-        return convert_percentage(self.price_percent_changes.get(field))
-
 
 class RelationshipItem(ApiModel):
     id: Optional[str]
@@ -129,14 +145,22 @@ class Pool(ApiModel):
     included: Optional[List[Union[PoolTransactionData]]] = None
 
     def get_token_pool(self) -> TokenPool:
-        attr = self.data.attributes
-        return TokenPool(
-            pool_name=attr.name,
-            price=attr.price_in_usd,
-            price_change_5m=attr.price_percent_change_from(field='last_5m'),
-            price_change_15m=attr.price_percent_change_from(field='last_15m'),
-            price_change_30m=attr.price_percent_change_from(field='last_30m'),
-            price_change_1h=attr.price_percent_change_from(field='last_1h'),
-            price_change_6h=attr.price_percent_change_from(field='last_6h'),
-            price_change_24h=attr.price_percent_change_value
-        )
+        return self.data.attributes.get_token_pool()
+
+
+class PoolPriceData(ApiModel):
+    id: str
+    type: str
+    attributes: PriceAttributes
+
+
+class PoolPrice(ApiModel):
+    """
+    Projection of `Pool` on the fields read by `get_token_pool`.
+
+    Every other attribute, the relationships and `included` are skipped without being validated.
+    """
+    data: PoolPriceData
+
+    def get_token_pool(self) -> TokenPool:
+        return self.data.attributes.get_token_pool()
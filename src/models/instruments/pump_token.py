@@ -1,10 +1,7 @@
-from datetime import datetime
 from typing import Optional
 
-from pydantic import Field
-
 from src.models.instruments.token import Token
-from src.utils.scripts import timestamp_to_date
+from src.utils.timestamps import EpochTimestamp
 
 
 class PumpToken(Token):
@@ -22,10 +19,10 @@ class PumpToken(Token):
     total_supply: int
     website: Optional[str] = None
     show_name: bool
-    last_trade_timestamp: Optional[datetime] = Field(alias="last_trade_timestamp", default_factory=lambda: timestamp_to_date)
-    king_of_the_hill_timestamp: Optional[datetime] = Field(alias="king_of_the_hill_timestamp", default_factory=lambda: timestamp_to_date)
+    last_trade_timestamp: EpochTimestamp
+    king_of_the_hill_timestamp: EpochTimestamp
     reply_count: int
-    last_reply: Optional[datetime] = Field(alias="last_reply", default_factory=lambda: timestamp_to_date)
+    last_reply: EpochTimestamp
     nsfw: bool
     market_id: Optional[str] = None
     inverted: Optional[bool] = None
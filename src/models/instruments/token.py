@@ -1,11 +1,8 @@
-from datetime import datetime
 from typing import Optional
 
-from pydantic import Field
-
 from src.models.integration.api import ApiModel
 from src.models.instruments.pool import Pool, TokenPool
-from src.utils.scripts import timestamp_to_date, hours_ago
+from src.utils.timestamps import EpochTimestamp
 
 
 class Token(ApiModel):
@@ -16,7 +13,7 @@ class Token(ApiModel):
     creator: str
     market_cap: float
     usd_market_cap: float
-    created_timestamp: Optional[datetime] = Field(alias="created_timestamp", default_factory=lambda: timestamp_to_date)
+    created_timestamp: EpochTimestamp
 
 
 class TokenData(ApiModel):
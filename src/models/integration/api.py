@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Iterable, Optional, Type, TypeVar
 
 from pydantic import BaseModel, ConfigDict
 
+M = TypeVar("M", bound=BaseModel)
+
 
 class ApiError(BaseModel):
     error_code: str
@@ -23,8 +25,32 @@ class ApiModel(BaseModel):
     )
 
 
+def construct_validated(model: Type[M], values: Dict[str, Any], fields_set: Iterable[str]) -> M:
+    """
+    Builds a model from values that were all validated already, e.g. taken from another instance.
+
+    Same as `model_construct` with every field given, which pydantic would still walk one by one looking
+    for defaults. This writes pydantic's instance state directly, so pydantic is pinned and
+    `tests/test_api_model.py` checks the result against `model_validate`.
+    """
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(fields_set))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
 class ApiException(Exception):
-    def __init__(self, status_code: int, message: str, response_text: Optional[str] = None, cause: Exception = None):
+    def __init__(
+            self,
+            status_code: int,
+            message: str,
+            response_text: Optional[str] = None,
+            cause: Exception = None,
+            retry_after: Optional[float] = None
+    ):
         super().__init__(message, cause)
         self.status_code = status_code
         self.response_text = response_text
+        self.retry_after = retry_after
@@ -1,9 +1,7 @@
-from pydantic import Field
-from datetime import datetime
 from typing import Optional
 
 from src.models.integration.api import ApiModel
-from src.utils.scripts import timestamp_to_date
+from src.utils.timestamps import EpochTimestamp
 
 
 class Trade(ApiModel):
@@ -13,7 +11,7 @@ class Trade(ApiModel):
     token_amount: int
     is_buy: bool
     user: str
-    timestamp: Optional[datetime] = Field(alias="timestamp", default_factory=lambda: timestamp_to_date)
+    timestamp: EpochTimestamp
     tx_index: int
     username: Optional[str] = None
     profile_image: Optional[str] = None
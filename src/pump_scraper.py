@@ -1,61 +1,236 @@
+import asyncio
+import time
+from dataclasses import dataclass
 from datetime import datetime
 from logging import Logger
-from typing import List, Union, Optional
+from typing import AsyncIterator, Callable, Iterable, List, Union, Optional
 
 from pydantic import Field
 
 from src.api.gecko_terminal import GeckoTerminal
-from src.api.pump import PumpApi
-from src.models.instruments.pool import Pool, TokenPool
+from src.api.pump import PumpApi, OrderByDirection
+from src.models.instruments.pool import PoolPrice, TokenPool
 from src.models.instruments.pump_token import PumpToken
-from src.models.integration.api import ApiError
-from src.utils.scripts import retry, hours_ago, str_to_bool, exception_swallow
+from src.models.integration.api import ApiError, construct_validated
+from src.models.portfolio.trade import Trade
+from src.utils.concurrency import HostLimiters
+from src.utils.condition import FILTER_SAMPLE_SIZE, ConditionBase, ConditionConstant, sort_bound
+from src.utils.persistent_cache import PersistentCache
+from src.utils.watermark import TradeCursors, Watermark
+from src.utils.scripts import RetryBudget, retry, str_to_bool, exception_swallow
+from src.utils.timestamps import utc_now
 from src.utils.api import exception_handler
 
 
 class PumpScraperToken(PumpToken):
     pool: Optional[TokenPool] = None
-    scraped_date: datetime = Field(alias="scraped_date", default_factory=lambda: hours_ago(0))
+    scraped_date: datetime = Field(alias="scraped_date", default_factory=utc_now)
+
+    @classmethod
+    def from_coin(
+            cls,
+            coin: PumpToken,
+            pool: Optional[TokenPool] = None,
+            scraped_date: Optional[datetime] = None
+    ) -> "PumpScraperToken":
+        """Wraps an already validated coin without dumping and validating its fields again."""
+        values = {**coin.__dict__, "pool": pool, "scraped_date": scraped_date or utc_now()}
+        return construct_validated(cls, values, coin.model_fields_set | {"pool", "scraped_date"})
+
+
+@dataclass
+class EnrichedToken:
+    token: PumpScraperToken
+    latency: Optional[float] = None
 
 
 class PumpScraper:
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, store: Optional[PersistentCache] = None):
         self.logger = logger.getChild(__name__)
-        self.pump_api = PumpApi(logger=logger)
-        self.pool_api = GeckoTerminal(logger=logger)
-        self.price_args = {"include_pricing"}
-        self.pump_args = {"term", "offset", "limit", "sort", "order", "includeNsfw"}
+        # one registry per scraper, its limiters are bound to the event loop the scraper runs on
+        self.limiters = HostLimiters()
+        self.pump_api = PumpApi(logger=logger, limiters=self.limiters)
+        self.pool_api = GeckoTerminal(logger=logger, limiters=self.limiters)
+        self.retry_budget = RetryBudget()
+        self.pump_api.store = store
+        self.pool_api.store = store
+        self.price_args = {"include_pricing", "pricing_concurrency"}
+        self.pump_args = {"term", "offset", "limit", "sort", "order", "includeNsfw", "concurrency"}
+
+    async def close(self):
+        await self.pump_api.close()
+        await self.pool_api.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
 
     @exception_handler
-    async def get_results(self, **kwargs) -> List[PumpScraperToken]:
+    async def get_results(self, conditions: Optional[ConditionBase[PumpScraperToken]] = None, **kwargs) -> List[PumpScraperToken]:
+        """Collects `iter_batches` into a single list."""
         results: List[PumpScraperToken] = []
+        async for batch in self.iter_batches(conditions=conditions, **kwargs):
+            results.extend(batch)
+
+        return results
 
+    async def iter_batches(
+            self,
+            conditions: Optional[ConditionBase[PumpScraperToken]] = None,
+            watermark: Optional[Watermark] = None,
+            **kwargs
+    ) -> AsyncIterator[List[PumpScraperToken]]:
+        """
+        Scrapes coins, prices their pools and yields the rows matching `conditions`, one batch per page.
+
+        Conditions that only read coin fields are applied before pricing so filtered out coins never cost a
+        pool lookup, the rest (e.g. on `pool`) are applied once the pools are known. Pagination also stops
+        as soon as the sort order proves that no later coin can match. The following pages keep downloading
+        while a page is being priced.
+
+        With a `watermark` only the coins past it are returned, the coins seen and whether the pagination
+        ran out before the limit are recorded on it for `Watermark.advance`.
+        """
         coin_args = {k: v for k, v in kwargs.items() if k in self.pump_args}
         include_pricing = str_to_bool(kwargs.get("include_pricing", "false"))
-        coins = await self.get_coins(**coin_args)
-        for coin in coins:
-            if not coin.raydium_pool or not include_pricing:
-                self.logger.debug(f"{coin.symbol} has no pool, skipping")
-                results.append(PumpScraperToken(**coin.model_dump()))
-                continue
-
-            if coin.complete and coin.raydium_pool:
-                self.logger.debug(f"Processing: {coin.symbol} ({coin.mint})...")
+        semaphore = asyncio.Semaphore(max(int(kwargs.get("pricing_concurrency") or 1), 1))
+
+        conditions = conditions or ConditionConstant(is_true=True)
+        if watermark is not None and watermark.condition() is not None:
+            conditions = conditions & watermark.condition()
+        coin_filter, pool_filter = conditions.split(set(PumpToken.model_fields))
+        sort = coin_args.get("sort", "created_timestamp")
+        descending = coin_args.get("order", OrderByDirection.DESC.value) == OrderByDirection.DESC.value
+        bound = sort_bound(coin_filter, field=sort, descending=descending)
+        if bound is not None and not coin_args.get("term"):
+            passes_bound = bound.compile()
+            coin_args["stop_when"] = lambda coin: not passes_bound(coin)
+
+        # ordered on the selectivity seen on the first page, then compiled once for the whole run
+        coin_predicate: Optional[Callable[[PumpToken], bool]] = None
+        pool_predicate: Optional[Callable[[PumpScraperToken], bool]] = None
+
+        total, passed, emitted = 0, 0, 0
+        latencies: List[float] = []
+        async for coins in self.iter_coins(**coin_args):
+            if watermark is not None:
+                watermark.observe(coins)
+            if coin_predicate is None:
+                coin_predicate = coin_filter.optimize(coins[:FILTER_SAMPLE_SIZE]).compile()
+            candidates = list(filter(coin_predicate, coins))
+            total += len(coins)
+            passed += len(candidates)
+
+            # gather keeps the output in the same order as the coins
+            results: List[EnrichedToken] = list(
+                await asyncio.gather(*(self.enrich(coin, include_pricing, semaphore) for coin in candidates))
+            )
+            latencies.extend(r.latency for r in results if r.latency is not None)
+
+            tokens = [r.token for r in results]
+            if tokens and pool_predicate is None:
+                pool_predicate = pool_filter.optimize(tokens[:FILTER_SAMPLE_SIZE]).compile()
+            batch = list(filter(pool_predicate, tokens)) if tokens else []
+            emitted += len(batch)
+            if batch:
+                yield batch
+
+        if watermark is not None:
+            # `iter_coins` stops exactly at the limit, fewer coins means the feed or the bound ended it
+            watermark.exhausted = total < int(coin_args.get("limit") or 50)
+        self.logger.info(f"{passed} of {total} coins pass the coin filters, {emitted} pass all filters")
+        if latencies:
+            latencies.sort()
+            self.logger.info(
+                f"Enriched {len(latencies)} pools: "
+                f"p50={latencies[len(latencies) // 2]:.3f}s, max={latencies[-1]:.3f}s"
+            )
+
+    async def iter_trades(
+            self,
+            mints: Iterable[str],
+            cursors: Optional[TradeCursors] = None,
+            concurrency: int = 4,
+            max_trades: Optional[int] = None,
+            **kwargs
+    ) -> AsyncIterator[List[Trade]]:
+        """
+        Pages the trades of many mints at once and yields them in batches, one mint after the other as the
+        mints complete.
+
+        Each mint resumes after its cursor, which only moves once the consumer has taken every batch of the
+        mint. The batches of a mint are held back until all its pages are fetched: pages come newest first,
+        so a mint failing halfway has no position that would both skip the trades already returned and keep
+        the older ones. A mint that fails is logged, nothing of it is yielded and its cursor stays where it
+        was, the others go on.
+        """
+        # a bounded queue stops the pagers when the consumer falls behind
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(concurrency, 1) * 2)
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+        done = object()
+
+        async def pull(mint: str):
+            async with semaphore:
+                batches: List[List[Trade]] = []
+                try:
+                    after = cursors.get(mint) if cursors is not None else None
+                    async for trades in self.pump_api.iter_trades(mint, after=after, max_trades=max_trades, **kwargs):
+                        batches.append(trades)
+                except Exception as e:
+                    self.logger.warning(f"Failed to get the trades of {mint}: {e}")
+                    return
+                newest = max(((t.slot, t.tx_index) for trades in batches for t in trades), default=None)
+                await queue.put((mint, newest, batches))
+
+        async def pull_all():
+            await asyncio.gather(*(pull(mint) for mint in dict.fromkeys(mints)))
+            await queue.put(done)
+
+        task = asyncio.create_task(pull_all())
+        total = 0
+        try:
+            while (item := await queue.get()) is not done:
+                mint, newest, batches = item
+                for trades in batches:
+                    total += len(trades)
+                    yield trades
+                # every batch of the mint was taken
+                if cursors is not None:
+                    cursors.advance(mint, newest)
+        finally:
+            task.cancel()
+        self.logger.info(f"{total} trades")
+
+    async def enrich(self, coin: PumpToken, include_pricing: bool, semaphore: asyncio.Semaphore) -> EnrichedToken:
+        if not coin.raydium_pool or not include_pricing:
+            self.logger.debug(f"{coin.symbol} has no pool, skipping")
+            return EnrichedToken(token=PumpScraperToken.from_coin(coin))
+
+        if not coin.complete:
+            self.logger.debug(f"{coin.symbol} skipped (pool={coin.raydium_pool}, grad={coin.complete})")
+            return EnrichedToken(token=PumpScraperToken.from_coin(coin))
+
+        async with semaphore:
+            self.logger.debug(f"Processing: {coin.symbol} ({coin.mint})...")
+            started = time.perf_counter()
+            try:
                 pool = await self.get_pool(coin.raydium_pool)
-                if pool:
-                    pool_data = pool.get_token_pool()
-                    results.append(PumpScraperToken(**coin.model_dump(), pool=pool_data))
-                    self.logger.debug(f"Processing: {coin.symbol} ({coin.mint})...[done]")
-                else:
-                    results.append(PumpScraperToken(**coin.model_dump()))
-                    self.logger.debug(f"Processing: {coin.symbol} ({coin.mint})...[skipped]")
-            else:
-                results.append(PumpScraperToken(**coin.model_dump()))
-                self.logger.debug(f"{coin.symbol} skipped (pool={coin.raydium_pool}, grad={coin.complete})")
+            except Exception as e:
+                # a failing pool must not fail the rest of the run
+                self.logger.warning(f"Failed to get pool for {coin.symbol} ({coin.raydium_pool}): {e}")
+                pool = None
+            latency = time.perf_counter() - started
 
-        return results
+        if pool:
+            self.logger.debug(f"Processing: {coin.symbol} ({coin.mint})...[done] in {latency:.3f}s")
+            return EnrichedToken(token=PumpScraperToken.from_coin(coin, pool=pool.get_token_pool()), latency=latency)
+        else:
+            self.logger.debug(f"Processing: {coin.symbol} ({coin.mint})...[skipped] in {latency:.3f}s")
+            return EnrichedToken(token=PumpScraperToken.from_coin(coin), latency=latency)
 
-    @retry(Exception, tries=3, delay=1, backoff=2)
+    @retry(Exception, tries=3, delay=1, backoff=2, deadline=60)
     async def get_coins(
             self,
             term: str = None,
@@ -68,7 +243,22 @@ class PumpScraper:
         else:
             return await self.pump_api.get_tokens(offset=offset, limit=limit, **kwargs)
 
+    async def iter_coins(
+            self,
+            term: str = None,
+            offset: int = 0,
+            limit: int = 50,
+            **kwargs
+    ) -> AsyncIterator[List[PumpToken]]:
+        if term:
+            # search results come back in one response
+            yield await self.get_coins(term=term, offset=offset, limit=limit, **kwargs)
+        else:
+            # every page is retried on its own, a retry of the whole stream would repeat yielded pages
+            async for page in self.pump_api.iter_tokens(offset=offset, limit=limit, **kwargs):
+                yield page
+
     @exception_swallow
-    @retry(Exception, tries=2, delay=3, backoff=2)
-    async def get_pool(self, pool_id: str) -> Union[List[Pool], ApiError]:
-        return await self.pool_api.get_pool(pool_id=pool_id)
+    @retry(Exception, tries=2, delay=3, backoff=2, deadline=30)
+    async def get_pool(self, pool_id: str) -> Union[PoolPrice, ApiError]:
+        return await self.pool_api.get_pool_price(pool_id=pool_id)
@@ -0,0 +1,93 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    size: int
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    Bounded in-memory TTL cache for API responses.
+
+    Entries are evicted least recently used first once either `max_entries` or `max_bytes` is exceeded.
+    `ttls` maps a url fragment (e.g. "/solana/pools/") to a TTL in seconds, urls that match no fragment
+    use `ttl`.
+    """
+
+    def __init__(
+            self,
+            ttl: float = 30,
+            ttls: Optional[Dict[str, float]] = None,
+            max_entries: int = 1000,
+            max_bytes: int = 32 * 1024 * 1024
+    ):
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(url: str, query_string: str) -> str:
+        # parameter order must not change the key
+        return f"{url}?{'&'.join(sorted(query_string.split('&')))}"
+
+    def ttl_for(self, key: str) -> float:
+        matches = [fragment for fragment in self.ttls if fragment in key]
+        return self.ttls[max(matches, key=len)] if matches else self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def put(self, key: str, value: Any, size: Optional[int] = None):
+        ttl = self.ttl_for(key)
+        if ttl <= 0:
+            return
+
+        size = size if size is not None else len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = CacheEntry(value=value, size=size, expires_at=time.monotonic() + ttl)
+        self.size += size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self.size}
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import json
+import time
+from enum import Enum
+from logging import Logger
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+from src.utils.persistent_cache import CacheBackend, shard_of
+
+# fields that move after a coin is created, the rest never change for a mint
+MUTABLE_FIELDS = {
+    "market_cap", "usd_market_cap", "virtual_sol_reserves", "virtual_token_reserves", "reply_count",
+    "last_trade_timestamp", "last_reply", "king_of_the_hill_timestamp", "complete", "raydium_pool", "pool"
+}
+
+
+class OutputMode(Enum):
+    ALL = "all"
+    CHANGED = "changed"
+    DIFF = "diff"
+
+
+class ChangeTracker:
+    """
+    Remembers a content hash and the values of the mutable fields of every mint between runs.
+
+    `changes` returns the rows to output for a batch: every token (`ALL`), only the new and changed ones
+    (`CHANGED`), or for those only the fields that changed (`DIFF`). The snapshot is updated either way.
+
+    The snapshot is stored as `shards` records, split by mint, so no record grows past the size limit of
+    the key-value store (50k mints are about 20 MB of json).
+    """
+
+    record_name = "changes"
+
+    def __init__(self, logger: Logger, fields: Optional[set] = None, max_entries: int = 50_000, shards: int = 16):
+        self.logger = logger.getChild(__name__)
+        self.fields = fields or MUTABLE_FIELDS
+        self.max_entries = max_entries
+        self.shards = max(shards, 1)
+        self.new = 0
+        self.changed = 0
+        self.unchanged = 0
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+
+    def shard_name(self, shard: int) -> str:
+        return f"{self.record_name}-{shard}"
+
+    def shard_of(self, mint: str) -> int:
+        return shard_of(mint, self.shards)
+
+    async def load(self, backend: CacheBackend):
+        try:
+            shards = await asyncio.gather(*(backend.load(self.shard_name(i)) for i in range(self.shards)))
+            self._snapshots = {mint: snapshot for shard in shards if shard for mint, snapshot in shard.items()}
+        except Exception as e:
+            self.logger.warning(f"Failed to load the token snapshots, every token counts as new: {e}")
+        self.logger.debug(f"Loaded {len(self._snapshots)} token snapshots")
+
+    async def save(self, backend: CacheBackend):
+        # keep the most recently seen mints when over capacity
+        snapshots = sorted(self._snapshots.items(), key=lambda kv: kv[1]["ts"], reverse=True)[:self.max_entries]
+        shards: List[Dict[str, Any]] = [{} for _ in range(self.shards)]
+        for mint, snapshot in snapshots:
+            shards[self.shard_of(mint)][mint] = snapshot
+        try:
+            await asyncio.gather(*(backend.save(self.shard_name(i), shard) for i, shard in enumerate(shards)))
+        except Exception as e:
+            self.logger.warning(f"Failed to save the token snapshots: {e}")
+        self.logger.info(f"Changes: new={self.new}, changed={self.changed}, unchanged={self.unchanged}")
+
+    @staticmethod
+    def digest(values: Dict[str, Any]) -> str:
+        encoded = json.dumps(values, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+    def changes(self, tokens: Sequence[BaseModel], mode: OutputMode = OutputMode.ALL) -> List[Dict[str, Any]]:
+        now = time.time()
+        rows = []
+        for token in tokens:
+            values = token.model_dump(mode="json", include=self.fields)
+            digest = self.digest(values)
+            previous = self._snapshots.get(token.mint)
+            self._snapshots[token.mint] = {"ts": now, "hash": digest, "values": values}
+
+            if previous is None:
+                self.new += 1
+            elif previous["hash"] != digest:
+                self.changed += 1
+            else:
+                self.unchanged += 1
+                if mode != OutputMode.ALL:
+                    continue
+
+            if mode == OutputMode.DIFF:
+                old = previous["values"] if previous else {}
+                changes = {
+                    field: {"old": old.get(field), "new": value}
+                    for field, value in values.items() if old.get(field) != value or previous is None
+                }
+                rows.append({
+                    "mint": token.mint,
+                    "change": "new" if previous is None else "changed",
+                    "changed_fields": sorted(changes),
+                    "changes": changes,
+                })
+            else:
+                rows.append(token.model_dump())
+
+        return rows
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into a single call.
+
+    Every awaiter gets the same result, or the same exception. A caller that is cancelled does not
+    cancel the shared call for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.shared = 0
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._forget(key, future))
+        else:
+            self.shared += 1
+
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # the result is consumed by the awaiters, mark a lone exception as retrieved
+        if not future.cancelled():
+            future.exception()
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # the lock keeps waiters in FIFO order
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit driven by additive increase / multiplicative decrease (AIMD).
+
+    Every healthy response grows the limit by about one per window of `limit` requests, an overloaded
+    response (429/5xx) cuts it by `decrease`, at most once per `cooldown` seconds so a burst of errors
+    from the same window counts as a single signal.
+    """
+
+    def __init__(
+            self,
+            initial: int = 4,
+            minimum: int = 1,
+            maximum: int = 32,
+            decrease: float = 0.5,
+            cooldown: float = 1.0
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._decreased_at = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, overloaded: bool = False):
+        async with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if overloaded:
+                if now - self._decreased_at >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._decreased_at = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+OVERLOAD_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def is_overload(e: BaseException) -> bool:
+    """Timeouts, dropped connections and 429/5xx responses, other errors say nothing about the host's load."""
+    if isinstance(e, (TimeoutError, httpx.TransportError)):
+        return True
+    return getattr(e, "status_code", None) in OVERLOAD_STATUS_CODES
+
+
+class HostLimiter:
+    """Rate limit and adaptive concurrency for every request sent to one host."""
+
+    def __init__(self, host: str, rate: float, burst: int, concurrency: int = 4, max_concurrency: int = 32):
+        self.host = host
+        self.bucket = TokenBucket(rate=rate, burst=burst)
+        self.concurrency = AdaptiveConcurrency(initial=concurrency, maximum=max_concurrency)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator["HostLimiter"]:
+        await self.concurrency.acquire()
+        overloaded = False
+        try:
+            await self.bucket.acquire()
+            yield self
+        except Exception as e:
+            overloaded = is_overload(e)
+            raise
+        finally:
+            await self.concurrency.release(overloaded=overloaded)
+
+
+class HostLimiters:
+    """
+    Registry of the `HostLimiter` of each host, shared by the apis of one scraper.
+
+    The limiters hold asyncio primitives, so a registry must not outlive the event loop it was used on.
+    """
+
+    def __init__(self):
+        self._hosts: Dict[str, HostLimiter] = {}
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def for_host(self, host: str, rate: float, burst: int, **kwargs) -> HostLimiter:
+        """Returns the limiter shared by every api talking to `host`, the first caller configures it."""
+        if host not in self._hosts:
+            self._hosts[host] = HostLimiter(host, rate=rate, burst=burst, **kwargs)
+        return self._hosts[host]
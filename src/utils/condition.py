@@ -1,8 +1,9 @@
+import math
 import operator as op
 
 from enum import Enum
 from datetime import datetime
-from typing import TypeVar, Union, Callable, Generic, Any, List, Tuple, Optional
+from typing import TypeVar, Union, Callable, Generic, Any, List, Tuple, Optional, Sequence, Set
 
 from pydantic import BaseModel
 
@@ -40,6 +41,55 @@ class ConjunctionEnum(str, Enum):
     OR = "OR"
 
 
+COMPARISONS = {
+    OperatorEnum.EQ: op.eq,
+    OperatorEnum.NEQ: op.ne,
+    OperatorEnum.GT: op.gt,
+    OperatorEnum.LT: op.lt,
+    OperatorEnum.GTE: op.ge,
+    OperatorEnum.LTE: op.le,
+}
+
+
+# rows `optimize` is usually given to measure the selectivity of the operands
+FILTER_SAMPLE_SIZE = 200
+
+
+def _pass_rate(condition: "ConditionBase[T]", sample: Sequence[T]) -> Optional[float]:
+    """Share of `sample` passing `condition`, None when it raises on any row."""
+    predicate = condition.compile()
+    passed = 0
+    for obj in sample:
+        try:
+            passed += bool(predicate(obj))
+        except Exception:
+            return None
+    return passed / len(sample)
+
+
+def _freeze(values: Union[set, list]) -> Union[frozenset, tuple]:
+    try:
+        return frozenset(values)
+    except TypeError:
+        # unhashable members fall back to a linear scan
+        return tuple(values)
+
+
+def _list_contains(values: list) -> Callable[[Any], bool]:
+    members = _freeze(values)
+    if isinstance(members, tuple):
+        return members.__contains__
+
+    def contains(value: Any) -> bool:
+        try:
+            return value in members
+        except TypeError:
+            # a list compares unhashable values by equality, like `evaluate`
+            return value in values
+
+    return contains
+
+
 class ConditionBase(Generic[T]):
     def __or__(self, other: "ConditionBase[T]") -> "ConditionGroup[T]":
         return ConditionGroup(left=self, conjunction=ConjunctionEnum.OR, right=other)
@@ -50,7 +100,37 @@ class ConditionBase(Generic[T]):
     def evaluate(self, obj: T) -> bool:
         pass
 
-    def to_sql(self, obj: T) -> Tuple[str, List[Any]]:
+    def compile(self) -> Callable[[T], bool]:
+        """Compiles the tree once into a flat, short-circuiting predicate equivalent to `evaluate`."""
+        pass
+
+    def flatten(self, conjunction: ConjunctionEnum) -> List["ConditionBase[T]"]:
+        """Returns the operands of `conjunction` at the top of the tree, nested groups included."""
+        return [self]
+
+    def split(self, fields: Set[FieldType]) -> Tuple["ConditionBase[T]", "ConditionBase[T]"]:
+        """
+        Splits the top-level AND operands into the ones that only read `fields` and the rest,
+        the tree is equivalent to `first & second`.
+        """
+        inside, outside = [], []
+        for operand in self.flatten(ConjunctionEnum.AND):
+            (inside if operand.fields() <= fields else outside).append(operand)
+        return all_of(inside), all_of(outside)
+
+    def cost(self) -> float:
+        """Relative cost of evaluating the condition on one row."""
+        return 0
+
+    def fields(self) -> Set[FieldType]:
+        """Returns every field referenced by the tree."""
+        return set()
+
+    def optimize(self, sample: Optional[Sequence[T]] = None) -> "ConditionBase[T]":
+        """Returns an equivalent tree whose AND/OR operands are flattened and ordered by cost and selectivity."""
+        return self
+
+    def to_sql(self, obj: Optional[T] = None) -> Tuple[str, List[Any]]:
         pass
 
 
@@ -61,7 +141,11 @@ class ConditionConstant(ConditionBase[T]):
     def evaluate(self, obj: T) -> bool:
         return self.is_true
 
-    def to_sql(self, obj: T) -> Tuple[str, List[Any]]:
+    def compile(self) -> Callable[[T], bool]:
+        is_true = self.is_true
+        return lambda obj: is_true
+
+    def to_sql(self, obj: Optional[T] = None) -> Tuple[str, List[Any]]:
         return ("1=1", []) if self.is_true else ("1=0", [])
 
 
@@ -108,21 +192,67 @@ class Condition(ConditionBase[T]):
             case _:
                 raise ValueError(f"Unsupported operator: {self.operator}")
 
-    def to_sql(self, obj: T) -> Tuple[str, List[Any]]:
-        """Converts a predicate function into an SQL WHERE clause."""
+    def fields(self) -> Set[FieldType]:
+        return {self.field}
+
+    def cost(self) -> float:
+        if not self.operator.has_value():
+            cost = 1
+        elif isinstance(self.value, datetime):
+            cost = 3  # timezone aware comparisons are the slowest
+        elif isinstance(self.value, (set, list)):
+            cost = 2
+        elif isinstance(self.value, (bool, str)):
+            cost = 1
+        else:
+            cost = 2
+        # attribute lookups are cheaper than arbitrary callables
+        return cost if isinstance(self.field, str) else cost + 3
+
+    def compile(self) -> Callable[[T], bool]:
+        getter, value = self.getter, self.value
+
+        match self.operator:
+            case OperatorEnum.IN | OperatorEnum.NOT_IN if not isinstance(value, (set, list)):
+                return lambda obj: False
+            case OperatorEnum.IN | OperatorEnum.NOT_IN if isinstance(value, list):
+                contains = _list_contains(value)
+                if self.operator == OperatorEnum.IN:
+                    return lambda obj: contains(getter(obj))
+                return lambda obj: not contains(getter(obj))
+            case OperatorEnum.IN:
+                members = _freeze(value)
+                return lambda obj: getter(obj) in members
+            case OperatorEnum.NOT_IN:
+                members = _freeze(value)
+                return lambda obj: getter(obj) not in members
+            case OperatorEnum.NULL:
+                return lambda obj: getter(obj) is None
+            case OperatorEnum.NOT_NULL:
+                return lambda obj: getter(obj) is not None
+            case operator if operator in COMPARISONS:
+                compare = COMPARISONS[operator]
+                return lambda obj: compare(getter(obj), value)
+            case _:
+                raise ValueError(f"Unsupported operator: {self.operator}")
+
+    def to_sql(self, obj: Optional[T] = None) -> Tuple[str, List[Any]]:
+        """Converts the condition into a parameterized SQL WHERE clause, `obj` is unused."""
         if not isinstance(self.field, str):
             raise Exception("Unsupported where predicate. Field must be a string")
 
         field_name = self.field
         operator_value = self.operator.to_sql()
 
-        if self.operator.has_value():
-            placeholders = '?'
-            field_value = self.getter(obj)
-            if isinstance(field_value, (list, set)):
-                placeholders = "(" + ", ".join("?" * len(field_value)) + ")"
-
-            return f"{field_name} {operator_value} {placeholders}", [field_value]
+        if self.operator in (OperatorEnum.IN, OperatorEnum.NOT_IN):
+            # same as `evaluate`, a value that is not a collection matches nothing
+            if not isinstance(self.value, (set, list)):
+                return "1=0", []
+            values = list(self.value)
+            placeholders = "(" + ", ".join("?" * len(values)) + ")"
+            return f"{field_name} {operator_value} {placeholders}", values
+        elif self.operator.has_value():
+            return f"{field_name} {operator_value} ?", [self.value]
         else:
             return f"{field_name} {operator_value}", []
 
@@ -147,7 +277,91 @@ class ConditionGroup(ConditionBase[T]):
         else:
             return left_result or right_result
 
-    def to_sql(self, obj: BaseModel) -> Tuple[str, List[Any]]:
+    def flatten(self, conjunction: ConjunctionEnum) -> List[ConditionBase[T]]:
+        if self.conjunction != conjunction:
+            return [self]
+        # a group without a right side is equivalent to its left side
+        right = self.right.flatten(conjunction) if self.right else []
+        return self.left.flatten(conjunction) + right
+
+    def cost(self) -> float:
+        return sum(operand.cost() for operand in self.flatten(self.conjunction))
+
+    def fields(self) -> Set[FieldType]:
+        return self.left.fields() | (self.right.fields() if self.right else set())
+
+    def optimize(self, sample: Optional[Sequence[T]] = None) -> ConditionBase[T]:
+        is_and = self.conjunction == ConjunctionEnum.AND
+        operands = []
+        for operand in self.flatten(self.conjunction):
+            if isinstance(operand, ConditionConstant):
+                if operand.is_true == is_and:
+                    continue
+                return operand
+            operands.append(operand.optimize(sample))
+
+        if not operands:
+            return ConditionConstant(is_true=is_and)
+
+        rates = [_pass_rate(operand, sample) if sample else 1.0 for operand in operands]
+
+        def rank(index: int) -> float:
+            # run first whatever is cheap and most likely to decide the group
+            deciding = 1.0
+            if sample:
+                deciding = 1 - rates[index] if is_and else rates[index]
+            return operands[index].cost() / deciding if deciding else math.inf
+
+        # operands raising on the sample keep their position, moving them would change which error surfaces
+        movable = [i for i, rate in enumerate(rates) if rate is not None]
+        ordered = list(operands)
+        for position, index in zip(movable, sorted(movable, key=rank)):
+            ordered[position] = operands[index]
+        optimized = ordered[0]
+        for operand in ordered[1:]:
+            optimized = ConditionGroup(left=optimized, conjunction=self.conjunction, right=operand)
+        return optimized
+
+    def compile(self) -> Callable[[T], bool]:
+        is_and = self.conjunction == ConjunctionEnum.AND
+        predicates = []
+        for operand in self.flatten(self.conjunction):
+            if isinstance(operand, ConditionConstant):
+                # `1=1` in an AND (or `1=0` in an OR) is a no-op, the opposite decides the group
+                if operand.is_true == is_and:
+                    continue
+                return operand.compile()
+            predicates.append(operand.compile())
+
+        if not predicates:
+            return ConditionConstant(is_true=is_and).compile()
+        elif len(predicates) == 1:
+            return predicates[0]
+        elif len(predicates) == 2:
+            first, second = predicates
+            if is_and:
+                return lambda obj: first(obj) and second(obj)
+            return lambda obj: first(obj) or second(obj)
+
+        predicates = tuple(predicates)
+        if is_and:
+            def all_of(obj: T) -> bool:
+                for predicate in predicates:
+                    if not predicate(obj):
+                        return False
+                return True
+
+            return all_of
+
+        def any_of(obj: T) -> bool:
+            for predicate in predicates:
+                if predicate(obj):
+                    return True
+            return False
+
+        return any_of
+
+    def to_sql(self, obj: Optional[BaseModel] = None) -> Tuple[str, List[Any]]:
         """Converts a predicate function into an SQL WHERE clause."""
         def default() -> Tuple[str, List[Any]]:
             return "1=1" if self.conjunction == ConjunctionEnum.AND else "1=0", []
@@ -157,6 +371,30 @@ class ConditionGroup(ConditionBase[T]):
         return f"({left_where}) {self.conjunction.value} ({right_where})", (left_bindings + right_bindings)
 
 
+def all_of(conditions: Sequence[ConditionBase[T]]) -> ConditionBase[T]:
+    """AND-s the conditions together, an empty sequence is always true."""
+    if not conditions:
+        return ConditionConstant(is_true=True)
+
+    combined = conditions[0]
+    for condition in conditions[1:]:
+        combined = combined & condition
+    return combined
+
+
+def sort_bound(condition: ConditionBase[T], field: str, descending: bool) -> Optional[ConditionBase[T]]:
+    """
+    Returns the AND-ed conditions on `field` that, once failed by a row of a result sorted by `field`,
+    fail for every following row too. Returns None when the tree has no such condition.
+    """
+    monotonic = {OperatorEnum.GT, OperatorEnum.GTE} if descending else {OperatorEnum.LT, OperatorEnum.LTE}
+    bounds = [
+        c for c in condition.flatten(ConjunctionEnum.AND)
+        if isinstance(c, Condition) and c.field == field and c.operator in monotonic
+    ]
+    return all_of(bounds) if bounds else None
+
+
 # Example Usage:
 if __name__ == "__main__":
     # Using a string field
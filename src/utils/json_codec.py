@@ -0,0 +1,18 @@
+from typing import Any
+
+import orjson
+
+
+def loads(data: bytes | str) -> Any:
+    """Decodes JSON, raises `json.JSONDecodeError` (which `orjson.JSONDecodeError` extends) on invalid input."""
+    return orjson.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=str)
+
+
+def is_json_document(data: bytes | str) -> bool:
+    """Cheap check that a body holds an object or an array, e.g. not a challenge page, without decoding it."""
+    stripped = data.lstrip()[:1]
+    return stripped in (b"{", b"[", "{", "[")
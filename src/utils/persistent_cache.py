@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import json
+import time
+from logging import Logger
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Set
+
+
+class CacheBackend(Protocol):
+    async def load(self, name: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    async def save(self, name: str, value: Dict[str, Any]):
+        ...
+
+
+def shard_of(key: str, shards: int) -> int:
+    """Stable shard of a key, the same in every run."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=4).digest(), "big") % shards
+
+
+def entry_size(data: Any) -> int:
+    if isinstance(data, (str, bytes)):
+        return len(data)
+    return len(json.dumps(data, default=str))
+
+
+class KeyValueStoreBackend:
+    """Stores each namespace as one record of an Apify key-value store."""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def load(self, name: str) -> Optional[Dict[str, Any]]:
+        return await self.store.get_value(name)
+
+    async def save(self, name: str, value: Dict[str, Any]):
+        await self.store.set_value(name, value)
+
+
+class LocalDirectoryBackend:
+    """Stores each namespace as a json file, used for development and tests."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}.json"
+
+    def _read(self, name: str) -> Optional[Dict[str, Any]]:
+        path = self._path(name)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def _write(self, name: str, value: Dict[str, Any]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path(name).write_text(json.dumps(value, default=str))
+
+    async def load(self, name: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._read, name)
+
+    async def save(self, name: str, value: Dict[str, Any]):
+        await asyncio.to_thread(self._write, name, value)
+
+
+class PersistentCache:
+    """
+    Timestamped response snapshots that outlive a single Actor run.
+
+    Each namespace (e.g. "pools", "coin_pages") is loaded lazily from the backend on first access and
+    only written back, in bulk, by `flush()`. Entries older than `max_age` seconds are ignored on read
+    and dropped on flush.
+
+    A namespace is stored as `shards` records split by key, and keeps at most `max_bytes` of data, so no
+    record grows past the size limit of the key-value store (a response body is up to ~50 KB).
+    """
+
+    def __init__(
+            self,
+            backend: CacheBackend,
+            logger: Logger,
+            max_age: float = 120,
+            max_entries: int = 5000,
+            max_bytes: int = 64 * 1024 * 1024,
+            shards: int = 16
+    ):
+        self.backend = backend
+        self.logger = logger.getChild(__name__)
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shards = max(shards, 1)
+        self.hits = 0
+        self.misses = 0
+        self._namespaces: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._dirty: Set[str] = set()
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def record_name(namespace: str, shard: int) -> str:
+        return f"cache-{namespace}-{shard}"
+
+    async def _entries(self, namespace: str) -> Dict[str, Dict[str, Any]]:
+        if namespace not in self._namespaces:
+            async with self._lock:
+                if namespace not in self._namespaces:
+                    try:
+                        shards = await asyncio.gather(
+                            *(self.backend.load(self.record_name(namespace, i)) for i in range(self.shards))
+                        )
+                    except Exception as e:
+                        self.logger.warning(f"Failed to load cache {namespace}: {e}")
+                        shards = []
+                    self._namespaces[namespace] = {k: v for shard in shards if shard for k, v in shard.items()}
+                    self.logger.debug(f"Loaded {len(self._namespaces[namespace])} {namespace} cache entries")
+        return self._namespaces[namespace]
+
+    async def get(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        entry = (await self._entries(namespace)).get(key)
+        max_age = self.max_age if max_age is None else max_age
+        if entry is None or time.time() - entry["ts"] > max_age:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry["data"]
+
+    async def put(self, namespace: str, key: str, data: Any):
+        entries = await self._entries(namespace)
+        entries[key] = {"ts": time.time(), "data": data}
+        self._dirty.add(namespace)
+
+    async def flush(self):
+        cutoff = time.time() - self.max_age
+        for namespace in sorted(self._dirty):
+            fresh = [(k, v) for k, v in self._namespaces[namespace].items() if v["ts"] >= cutoff]
+            # keep the newest entries when over capacity
+            fresh = sorted(fresh, key=lambda kv: kv[1]["ts"], reverse=True)[:self.max_entries]
+            shards: List[Dict[str, Any]] = [{} for _ in range(self.shards)]
+            kept = size = 0
+            for key, entry in fresh:
+                size += entry_size(entry["data"])
+                if size > self.max_bytes:
+                    break
+                shards[shard_of(key, self.shards)][key] = entry
+                kept += 1
+            try:
+                await asyncio.gather(
+                    *(self.backend.save(self.record_name(namespace, i), shard) for i, shard in enumerate(shards))
+                )
+                self.logger.debug(f"Saved {kept} {namespace} cache entries")
+            except Exception as e:
+                self.logger.warning(f"Failed to save cache {namespace}: {e}")
+        self._dirty.clear()
+        self.logger.info(f"Persistent cache: hits={self.hits}, misses={self.misses}")
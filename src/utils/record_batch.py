@@ -0,0 +1,167 @@
+import sys
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Generic, Iterable, List, Optional, Sequence, Type, TypeVar, Union, get_args, get_origin
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.models.integration.api import construct_validated
+from src.utils.columnar import Column, evaluate_mask
+from src.utils.condition import ConditionBase
+from src.utils.timestamps import from_epoch_ms, from_epoch_ms_many, to_epoch_ms
+
+T = TypeVar("T", bound=BaseModel)
+
+# stands for a missing timestamp in the epoch millisecond arrays
+MISSING_MS = -2 ** 63
+
+# array typecode of each compact kind, the other fields are kept as python objects
+TYPECODES = {"int": "q", "float": "d", "bool": "b", "timestamp": "q"}
+
+
+def field_kind(annotation: Any) -> str:
+    optional = False
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        optional = len(args) < len(get_args(annotation))
+        annotation = args[0] if len(args) == 1 else annotation
+
+    if annotation is datetime:
+        return "timestamp"
+    elif optional:
+        return "object"
+    elif annotation is bool:
+        return "bool"
+    elif annotation is int:
+        return "int"
+    elif annotation is float:
+        return "float"
+    return "object"
+
+
+class RecordBatch(Generic[T]):
+    """
+    Struct-of-arrays copy of a list of models, for holding tens of thousands of rows in memory.
+
+    Ints, floats and bools live in `array`s, datetimes in an array of epoch milliseconds, the fields
+    listed in `interned` (repeated values such as creators) as interned strings and everything else as a
+    list of objects. Models are only built again by `record`/`to_records`, at the edges of the pipeline.
+
+    Meant for code holding a large token set at once, e.g. a backfill or an analysis over the history.
+    The Actor itself streams pages of at most 50 coins from scraping to the dataset, which a batch would
+    only make slower, so it does not use one.
+    """
+
+    def __init__(self, model: Type[T], interned: Iterable[str] = ("creator", "username")):
+        self.model = model
+        self.kinds = {name: field_kind(info.annotation) for name, info in model.model_fields.items()}
+        self.interned = {name for name in interned if self.kinds.get(name) == "object"}
+        self.data: Dict[str, Union[array, List[Any]]] = {
+            name: array(TYPECODES[kind]) if kind in TYPECODES else [] for name, kind in self.kinds.items()
+        }
+        self.length = 0
+
+    @classmethod
+    def from_records(cls, model: Type[T], records: Iterable[T], **kwargs) -> "RecordBatch[T]":
+        batch = cls(model, **kwargs)
+        batch.extend(records)
+        return batch
+
+    def __len__(self):
+        return self.length
+
+    def extend(self, records: Iterable[T]):
+        for record in records:
+            self.append(record)
+
+    def append(self, record: T):
+        values = record.__dict__
+        for name, kind in self.kinds.items():
+            value = values.get(name)
+            if kind == "timestamp":
+                value = MISSING_MS if value is None else to_epoch_ms(value)
+            elif name in self.interned and value is not None:
+                value = sys.intern(value)
+            self.data[name].append(value)
+        self.length += 1
+
+    def record(self, index: int) -> T:
+        values = {}
+        for name, kind in self.kinds.items():
+            value = self.data[name][index]
+            if kind == "timestamp":
+                value = None if value == MISSING_MS else from_epoch_ms(value)
+            elif kind == "bool":
+                value = bool(value)
+            values[name] = value
+        return self._build(values)
+
+    def to_records(self, start: int = 0, stop: Optional[int] = None) -> List[T]:
+        # converting column by column lets the timestamps go through the batch conversion
+        rows = range(*slice(start, stop).indices(self.length))
+        names, columns = list(self.kinds), []
+        for name, kind in self.kinds.items():
+            values = self.data[name][rows.start:rows.stop:rows.step]
+            if kind == "timestamp":
+                values = from_epoch_ms_many(values, missing=MISSING_MS)
+            elif kind == "bool":
+                values = [bool(v) for v in values]
+            columns.append(values)
+        return [self._build(dict(zip(names, row))) for row in zip(*columns)]
+
+    def epoch_ms(self, name: str) -> array:
+        """Raw epoch milliseconds of a timestamp field, `MISSING_MS` for None, without building datetimes."""
+        return self.data[name]
+
+    def _build(self, values: Dict[str, Any]) -> T:
+        # every field comes from a validated model
+        return construct_validated(self.model, values, values)
+
+    def take(self, indices: Sequence[int]) -> "RecordBatch[T]":
+        batch = RecordBatch(self.model)
+        batch.interned = self.interned
+        for name, values in self.data.items():
+            taken = [values[i] for i in indices]
+            batch.data[name] = array(values.typecode, taken) if isinstance(values, array) else taken
+        batch.length = len(indices)
+        return batch
+
+    def columns(self, fields: Iterable[str]) -> Dict[str, Column]:
+        """NumPy columns for `columnar`, the numeric arrays are shared rather than copied."""
+        columns = {}
+        for name in fields:
+            kind, values = self.kinds[name], self.data[name]
+            if kind == "timestamp":
+                ms = np.frombuffer(values, dtype=np.int64)
+                nulls = ms == MISSING_MS
+                columns[name] = Column(np.where(nulls, 0, ms) / 1000, nulls, "datetime")
+            elif kind in TYPECODES:
+                data = np.frombuffer(values, dtype=np.float64 if kind == "float" else np.int64 if kind == "int" else np.int8)
+                data = data.astype(bool) if kind == "bool" else data
+                columns[name] = Column(data, np.zeros(self.length, dtype=bool), "bool" if kind == "bool" else "number")
+            else:
+                data = np.empty(self.length, dtype=object)
+                data[:] = values
+                columns[name] = Column(data, np.fromiter((v is None for v in values), dtype=bool, count=self.length), "object")
+        return columns
+
+    def filter(self, condition: ConditionBase[T]) -> "RecordBatch[T]":
+        """Keeps the rows matching `condition`, with NumPy masks when possible."""
+        fields = condition.fields()
+        if all(isinstance(f, str) and f in self.kinds for f in fields):
+            try:
+                mask = evaluate_mask(condition, self.columns(fields), self.length)
+                return self.take(np.flatnonzero(mask).tolist())
+            except (TypeError, ValueError):
+                pass  # mixed or unsupported column types, use the row by row path
+
+        predicate = condition.compile()
+        return self.take([i for i in range(self.length) if predicate(self.record(i))])
+
+    def nbytes(self) -> int:
+        """Memory held by the batch, strings and other shared objects excluded."""
+        return sum(
+            values.buffer_info()[1] * values.itemsize if isinstance(values, array) else sys.getsizeof(values)
+            for values in self.data.values()
+        )
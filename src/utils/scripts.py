@@ -1,6 +1,9 @@
+import asyncio
+import inspect
 import re
 import sys
 import time
+from email.utils import parsedate_to_datetime
 from functools import wraps
 
 import pytz
@@ -8,6 +11,8 @@ import random
 from datetime import datetime, timedelta
 from typing import Optional
 
+from src.utils.timestamps import UTC, ago, from_epoch_ms, utc_now
+
 primitives = (bool, str, int, float, type(None))
 
 
@@ -21,9 +26,7 @@ def format_time(timestamp):
 
 def hours_ago(hours: int = 0) -> datetime:
     """Returns the datetime for one hour ago, including timezone info."""
-    tz = pytz.timezone('UTC')  # You can replace 'UTC' with your desired timezone
-    now = datetime.now(tz)
-    return now - timedelta(hours=hours)
+    return ago(hours=hours)
 
 
 def start_of_day(days_ago_val: int = 0, timezone: str = "UTC") -> datetime:
@@ -46,9 +49,7 @@ def start_of_day(days_ago_val: int = 0, timezone: str = "UTC") -> datetime:
 
 def days_ago(days: int = 1) -> datetime:
     """Returns the datetime for one hour ago, including timezone info."""
-    tz = pytz.timezone('UTC')  # You can replace 'UTC' with your desired timezone
-    now = datetime.now(tz)
-    return now - timedelta(days=days)
+    return ago(days=days)
 
 
 def timestamp_to_date(timestamp: Optional[int]) -> Optional[datetime]:
@@ -56,10 +57,7 @@ def timestamp_to_date(timestamp: Optional[int]) -> Optional[datetime]:
     Convert a Unix timestamp (in milliseconds) to a datetime object.
     Return None if the timestamp is None.
     """
-    if timestamp is not None:
-        tz = pytz.timezone('UTC')  # You can replace 'UTC' with your desired timezone
-        return datetime.fromtimestamp(timestamp / 1000, tz=tz)
-    return None
+    return from_epoch_ms(timestamp)
 
 
 def convert_percentage(percentage: str) -> float:
@@ -79,12 +77,23 @@ def random_between(a: int, b: int) -> int:
     return random.randint(a, b)
 
 
-def stagger(a: int, b: int):
+async def stagger(a: int, b: int):
     wait = random_between(a, b)
-    time.sleep(wait)
+    await asyncio.sleep(wait)
 
 
 def exception_swallow(func):
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                print(f"Failed call to {func}", e, file=sys.stderr)
+            return None
+
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
@@ -96,29 +105,147 @@ def exception_swallow(func):
     return wrapper
 
 
-def retry(exception_to_check, tries=3, delay=2, backoff=2):
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of calls so a degraded upstream cannot multiply the request volume.
+
+    Every call deposits `ratio` tokens (up to `max_tokens`) and every retry spends one.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 10, max_tokens: float = 100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+
+    def deposit(self):
+        self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+# the budget of the instance a decorated method is called on, see `retry`
+INSTANCE_RETRY_BUDGET = object()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a `Retry-After` header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        return max((parsedate_to_datetime(value) - utc_now()).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def retry(
+        exception_to_check,
+        tries=3,
+        delay=2,
+        backoff=2,
+        max_delay: float = 30,
+        deadline: Optional[float] = None,
+        retry_on=RETRYABLE_STATUS_CODES,
+        budget=INSTANCE_RETRY_BUDGET
+):
     """
-    Retry calling the decorated function using an exponential backoff.
+    Retry calling the decorated function (or coroutine function) using a full-jitter exponential backoff.
 
     :param exception_to_check: The exception to check. Maybe a tuple of exceptions to check.
     :param tries: Number of times to try (not retry) before giving up.
     :param delay: Initial delay between retries in seconds.
     :param backoff: Backoff multiplier (e.g. value of 2 will double the delay each retry).
+    :param max_delay: Upper bound of a single delay in seconds.
+    :param deadline: Total seconds allowed for the call including retries. A coroutine attempt is cancelled
+        with a `TimeoutError` once it is reached, a plain function only stops retrying past it.
+    :param retry_on: Status codes worth retrying, exceptions carrying another `status_code` are raised at once.
+    :param budget: Retry budget shared between calls. By default the `retry_budget` of the instance the
+        decorated method is called on, so each client has its own, or one per decorated function. `None`
+        disables it.
     """
+    own_budget = RetryBudget()
+
+    def budget_for(args) -> Optional[RetryBudget]:
+        if budget is not INSTANCE_RETRY_BUDGET:
+            return budget
+        instance_budget = getattr(args[0], "retry_budget", None) if args else None
+        return instance_budget if isinstance(instance_budget, RetryBudget) else own_budget
+
+    def next_delay(e: Exception, attempt: int) -> float:
+        # honour the server when it says how long to wait
+        retry_after = getattr(e, "retry_after", None)
+        if retry_after is not None:
+            return min(retry_after, max_delay)
+        return random.uniform(0, min(max_delay, delay * backoff ** attempt))
+
+    def should_retry(e: Exception, attempt: int, wait: float, started: float, call_budget: Optional[RetryBudget]) -> bool:
+        status_code = getattr(e, "status_code", None)
+        if isinstance(status_code, int) and status_code not in retry_on:
+            return False
+        if attempt >= tries - 1:
+            return False
+        if deadline is not None and time.monotonic() - started + wait > deadline:
+            return False
+        if call_budget is not None and not call_budget.withdraw():
+            print(f"Retry budget exhausted, not retrying {e}", file=sys.stderr)
+            return False
+        return True
 
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.monotonic()
+                call_budget = budget_for(args)
+                if call_budget is not None:
+                    call_budget.deposit()
+                attempt = 0
+                while True:
+                    try:
+                        if deadline is None:
+                            return await func(*args, **kwargs)
+                        # the attempt in flight must not run past the deadline either
+                        remaining = deadline - (time.monotonic() - started)
+                        return await asyncio.wait_for(func(*args, **kwargs), timeout=max(remaining, 0))
+                    except exception_to_check as e:
+                        wait = next_delay(e, attempt)
+                        if not should_retry(e, attempt, wait, started, call_budget):
+                            raise
+                        print(f"{e}, Retrying in {wait:.2f} seconds...", file=sys.stderr)
+                        await asyncio.sleep(wait)
+                        attempt += 1
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            _tries, _delay = tries, delay
-            while _tries > 1:
+            started = time.monotonic()
+            call_budget = budget_for(args)
+            if call_budget is not None:
+                call_budget.deposit()
+            attempt = 0
+            while True:
                 try:
                     return func(*args, **kwargs)
                 except exception_to_check as e:
-                    print(f"{e}, Retrying in {_delay} seconds...", file=sys.stderr)
-                    time.sleep(_delay)
-                    _tries -= 1
-                    _delay *= backoff
-            return func(*args, **kwargs)
+                    wait = next_delay(e, attempt)
+                    if not should_retry(e, attempt, wait, started, call_budget):
+                        raise
+                    print(f"{e}, Retrying in {wait:.2f} seconds...", file=sys.stderr)
+                    time.sleep(wait)
+                    attempt += 1
 
         return wrapper
 
@@ -143,7 +270,7 @@ def parse_date(input_str: str) -> datetime:
     # Try parsing as timestamp
     try:
         timestamp = float(input_str)
-        return datetime.fromtimestamp(timestamp, pytz.timezone('UTC'))
+        return datetime.fromtimestamp(timestamp, UTC)
     except ValueError:
         pass
 
@@ -151,7 +278,7 @@ def parse_date(input_str: str) -> datetime:
     match = re.match(r"(\d+)\s*(second|minute|hour|day|week|month|year)s?", input_str, re.IGNORECASE)
     if match:
         value, unit = int(match.group(1)), match.group(2).lower()
-        now = hours_ago(0)
+        now = utc_now()
 
         if unit == "second":
             delta = timedelta(seconds=value)
@@ -0,0 +1,59 @@
+import time
+from logging import Logger
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+class DatasetWriter:
+    """
+    Buffers rows and hands them to `push` in batches.
+
+    A batch is pushed once it holds `batch_size` rows, or on the next write after `flush_interval` seconds
+    without a push. Leaving the context pushes whatever is left, also when the run fails, so the rows
+    scraped so far are kept.
+    """
+
+    def __init__(
+            self,
+            push: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+            logger: Logger,
+            batch_size: int = 200,
+            flush_interval: float = 10.0
+    ):
+        self.push = push
+        self.logger = logger.getChild(__name__)
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._flushed_at = time.monotonic()
+
+    @property
+    def pending(self) -> int:
+        """Rows written but not pushed yet, e.g. after a failed flush."""
+        return len(self._buffer)
+
+    async def write(self, rows: List[Dict[str, Any]]):
+        self._buffer.extend(rows)
+        while len(self._buffer) >= self.batch_size:
+            await self._push(self._buffer[:self.batch_size])
+            del self._buffer[:self.batch_size]
+
+        if self._buffer and time.monotonic() - self._flushed_at >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        if self._buffer:
+            await self._push(self._buffer)
+            self._buffer = []
+
+    async def _push(self, rows: List[Dict[str, Any]]):
+        await self.push(rows)
+        self.written += len(rows)
+        self._flushed_at = time.monotonic()
+        self.logger.debug(f"Pushed {len(rows)} rows, {self.written} in total")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.flush()
@@ -0,0 +1,198 @@
+import asyncio
+import sqlite3
+from datetime import datetime
+from logging import Logger
+from pathlib import Path
+from typing import Any, Generic, List, Optional, Sequence, Type, TypeVar
+
+from pydantic import BaseModel
+
+from src.utils.columnar import filter_rows
+from src.utils.condition import FILTER_SAMPLE_SIZE, ConditionBase, ConditionConstant
+from src.utils.timestamps import to_epoch_ms
+
+# token fields stored in their own column, every other field is only kept in the json document
+TOKEN_COLUMNS = {
+    "mint": "TEXT PRIMARY KEY",
+    "name": "TEXT",
+    "symbol": "TEXT",
+    "creator": "TEXT",
+    "market_cap": "REAL",
+    "usd_market_cap": "REAL",
+    "created_timestamp": "INTEGER",
+    "raydium_pool": "TEXT",
+    "complete": "INTEGER",
+    "virtual_sol_reserves": "INTEGER",
+    "virtual_token_reserves": "INTEGER",
+    "total_supply": "INTEGER",
+    "last_trade_timestamp": "INTEGER",
+    "king_of_the_hill_timestamp": "INTEGER",
+    "reply_count": "INTEGER",
+    "last_reply": "INTEGER",
+    "nsfw": "INTEGER",
+    "scraped_date": "INTEGER",
+}
+# `mint` is indexed by the primary key
+TOKEN_INDEXES = ["created_timestamp", "market_cap", "complete"]
+
+T = TypeVar("T", bound=BaseModel)
+
+POOL_COLUMNS = [
+    "pool_name", "price", "price_change_5m", "price_change_15m", "price_change_30m",
+    "price_change_1h", "price_change_6h", "price_change_24h"
+]
+
+
+def to_sql_value(value: Any) -> Any:
+    # datetimes are stored as epoch milliseconds, like the pump.fun api sends them
+    if isinstance(value, datetime):
+        return to_epoch_ms(value)
+    return value
+
+
+def sort_rows(rows: List[T], field: str, descending: bool) -> List[T]:
+    """Sorts like sqlite's ORDER BY: missing values come first ascending and last descending."""
+    present = [r for r in rows if getattr(r, field) is not None]
+    missing = [r for r in rows if getattr(r, field) is None]
+    present.sort(key=lambda r: getattr(r, field), reverse=descending)
+    return present + missing if descending else missing + present
+
+
+class SqliteStore(Generic[T]):
+    """
+    Local SQLite history of scraped tokens and their pool prices.
+
+    Tokens are upserted by mint, every priced token also appends a row to `pool_snapshots`. Filters are
+    answered with `ConditionBase.to_sql` against the indexed columns, conditions on other fields are
+    applied in Python on the rows the query returns.
+    """
+
+    def __init__(self, path: str | Path, model: Type[T], logger: Logger):
+        self.path = Path(path)
+        self.model = model
+        self.logger = logger.getChild(__name__)
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # every call runs on a worker thread, one at a time
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._create_schema()
+        return self._connection
+
+    def _create_schema(self):
+        columns = ", ".join(f"{name} {kind}" for name, kind in TOKEN_COLUMNS.items())
+        pool_columns = ", ".join(f"{name} REAL" if name != "pool_name" else f"{name} TEXT" for name in POOL_COLUMNS)
+        with self._connection:
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS tokens ({columns}, data TEXT NOT NULL)")
+            self._add_missing_columns()
+            for column in TOKEN_INDEXES:
+                self._connection.execute(f"CREATE INDEX IF NOT EXISTS tokens_{column} ON tokens ({column})")
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS pool_snapshots (mint TEXT NOT NULL, scraped_date INTEGER NOT NULL, {pool_columns})"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS pool_snapshots_mint ON pool_snapshots (mint, scraped_date)")
+
+    def _add_missing_columns(self):
+        # databases written by an older version lack the columns added since, fill them from the documents
+        existing = {row[1] for row in self._connection.execute("PRAGMA table_info(tokens)")}
+        missing = [name for name in TOKEN_COLUMNS if name not in existing]
+        if not missing:
+            return
+
+        for name in missing:
+            self._connection.execute(f"ALTER TABLE tokens ADD COLUMN {name} {TOKEN_COLUMNS[name]}")
+        rows = self._connection.execute("SELECT mint, data FROM tokens").fetchall()
+        self._connection.executemany(
+            f"UPDATE tokens SET {', '.join(f'{name} = ?' for name in missing)} WHERE mint = ?",
+            [
+                [to_sql_value(getattr(token, name)) for name in missing] + [mint]
+                for mint, token in ((mint, self.model.model_validate_json(data)) for mint, data in rows)
+            ]
+        )
+        self.logger.info(f"Added the columns {missing} to {len(rows)} stored tokens")
+
+    async def write(self, tokens: Sequence[T]):
+        if tokens:
+            await asyncio.to_thread(self._write, tokens)
+
+    def _write(self, tokens: Sequence[T]):
+        names = list(TOKEN_COLUMNS)
+        token_rows = [
+            [to_sql_value(getattr(t, name)) for name in names] + [t.model_dump_json()]
+            for t in tokens
+        ]
+        pool_rows = [
+            [t.mint, to_sql_value(t.scraped_date)] + [getattr(t.pool, name) for name in POOL_COLUMNS]
+            for t in tokens if getattr(t, "pool", None) is not None
+        ]
+
+        # one transaction per batch
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO tokens ({', '.join(names)}, data) VALUES ({', '.join('?' * (len(names) + 1))})",
+                token_rows
+            )
+            if pool_rows:
+                self.connection.executemany(
+                    f"INSERT INTO pool_snapshots (mint, scraped_date, {', '.join(POOL_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * (len(POOL_COLUMNS) + 2))})",
+                    pool_rows
+                )
+        self.logger.debug(f"Stored {len(token_rows)} tokens, {len(pool_rows)} pool snapshots")
+
+    async def query(
+            self,
+            conditions: Optional[ConditionBase[T]] = None,
+            sort: Optional[str] = None,
+            descending: bool = True,
+            offset: int = 0,
+            limit: Optional[int] = None
+    ) -> List[T]:
+        return await asyncio.to_thread(self._query, conditions, sort, descending, offset, limit)
+
+    def _query(
+            self,
+            conditions: Optional[ConditionBase[T]],
+            sort: Optional[str],
+            descending: bool,
+            offset: int,
+            limit: Optional[int]
+    ) -> List[T]:
+        if sort is not None and sort not in self.model.model_fields:
+            raise ValueError(f"Cannot sort {self.model.__name__} by {sort}")
+
+        conditions = conditions or ConditionConstant(is_true=True)
+        indexed, remaining = conditions.split(set(TOKEN_COLUMNS))
+        where, bindings = indexed.to_sql()
+
+        sql = f"SELECT data FROM tokens WHERE {where}"
+        sorted_by_sqlite = sort is None or sort in TOKEN_COLUMNS
+        if sort is not None and sorted_by_sqlite:
+            sql += f" ORDER BY {sort} {'DESC' if descending else 'ASC'}"
+        # the window can only be applied by sqlite when it sees every condition and the order
+        paged = isinstance(remaining, ConditionConstant) and remaining.is_true and sorted_by_sqlite
+        if paged:
+            sql += " LIMIT ? OFFSET ?"
+            bindings = bindings + [limit if limit is not None else -1, offset]
+
+        self.logger.debug(f"Querying {sql} with {bindings}")
+        rows = self.connection.execute(sql, [to_sql_value(b) for b in bindings]).fetchall()
+        tokens = [self.model.model_validate_json(data) for (data,) in rows]
+        if paged:
+            return tokens
+
+        # a single pass over possibly many rows, worth ordering the predicates on a sample first
+        tokens = filter_rows(remaining.optimize(tokens[:FILTER_SAMPLE_SIZE]), tokens) if tokens else tokens
+        if not sorted_by_sqlite:
+            tokens = sort_rows(tokens, sort, descending)
+        return tokens[offset:offset + limit] if limit is not None else tokens[offset:]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
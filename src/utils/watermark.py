@@ -0,0 +1,129 @@
+from datetime import datetime
+from logging import Logger
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from src.utils.condition import Condition, ConditionBase, OperatorEnum
+from src.utils.persistent_cache import CacheBackend
+from src.utils.timestamps import from_epoch_ms, to_epoch_ms
+
+# sort fields that only grow for a coin, so everything past the mark is new or changed
+WATERMARK_FIELDS = {"created_timestamp", "last_trade_timestamp", "last_reply"}
+
+
+class Watermark:
+    """
+    Newest value of a descending sort field seen by previous runs.
+
+    `mints` are the coins seen exactly at `value`, so a coin sharing the newest millisecond is only
+    returned once. Pass `condition()` along with the filters: it drops already seen coins and, being a
+    bound on the sort field, stops the pagination on the first page that reaches them.
+
+    `advance` only moves the mark when the run saw every coin past it: the pagination reached the
+    previous mark or the end of the feed, or there was no mark yet. A run cut short by its `limit` keeps
+    the old mark, otherwise the coins between its last page and the old mark would never be returned.
+    """
+
+    def __init__(self, field: str, value: Optional[datetime] = None, mints: Iterable[str] = ()):
+        self.field = field
+        self.value = value
+        self.mints: Set[str] = set(mints)
+        self.observed = 0
+        # set by the scraper when the pagination ran out of coins before the limit
+        self.exhausted = False
+        self.reached = False
+        self._newest = value
+        self._newest_mints: Set[str] = set(mints)
+
+    @staticmethod
+    def record_name(field: str) -> str:
+        return f"watermark-{field}"
+
+    @classmethod
+    async def load(cls, backend: CacheBackend, field: str, logger: Logger) -> "Watermark":
+        try:
+            record = await backend.load(cls.record_name(field))
+        except Exception as e:
+            logger.warning(f"Failed to load the {field} watermark, starting over: {e}")
+            record = None
+        if not record:
+            return cls(field)
+        return cls(field, value=from_epoch_ms(record["value"]), mints=record.get("mints", []))
+
+    async def save(self, backend: CacheBackend):
+        if self.value is not None:
+            await backend.save(self.record_name(self.field), self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"value": to_epoch_ms(self.value), "mints": sorted(self.mints)}
+
+    def condition(self) -> Optional[ConditionBase]:
+        if self.value is None:
+            return None
+
+        newer = Condition(self.field, OperatorEnum.GTE, self.value)
+        if self.mints:
+            # the seen mints are only dropped at the mark itself, one that moved past it (e.g. traded again)
+            # is returned; the top-level `>=` keeps bounding the pagination
+            unseen = Condition(self.field, OperatorEnum.GT, self.value) | Condition("mint", OperatorEnum.NOT_IN, set(self.mints))
+            return newer & unseen
+        return newer
+
+    @property
+    def complete(self) -> bool:
+        return self.value is None or self.reached or self.exhausted
+
+    def observe(self, coins: Iterable[Any]):
+        """Records the newest coin seen and whether the previous mark was reached."""
+        for coin in coins:
+            value = getattr(coin, self.field)
+            if value is None:
+                continue
+            self.observed += 1
+            if self.value is not None and value <= self.value:
+                self.reached = True
+            if self._newest is None or value > self._newest:
+                self._newest = value
+                self._newest_mints = {coin.mint}
+            elif value == self._newest:
+                self._newest_mints.add(coin.mint)
+
+    def advance(self) -> bool:
+        """Moves the mark to the newest coin seen when the run is `complete`, returns whether it moved."""
+        if not self.complete:
+            return False
+        self.value, self.mints = self._newest, self._newest_mints
+        return True
+
+
+class TradeCursors:
+    """
+    Position, as (slot, tx_index), of the newest trade returned for each mint, kept between runs.
+
+    A mint only moves forward once all its new trades were returned, so an interrupted mint is paged
+    again from its previous position on the next run. Save the cursors once the returned trades are
+    persisted, a cursor saved past unsaved trades skips them for good.
+    """
+
+    record_name = "trade-cursors"
+
+    def __init__(self, logger: Logger):
+        self.logger = logger.getChild(__name__)
+        self.cursors: Dict[str, Tuple[int, int]] = {}
+
+    async def load(self, backend: CacheBackend):
+        try:
+            record = await backend.load(self.record_name) or {}
+        except Exception as e:
+            self.logger.warning(f"Failed to load the trade cursors, every mint starts over: {e}")
+            record = {}
+        self.cursors = {mint: (slot, tx_index) for mint, (slot, tx_index) in record.items()}
+
+    async def save(self, backend: CacheBackend):
+        await backend.save(self.record_name, {mint: list(cursor) for mint, cursor in self.cursors.items()})
+
+    def get(self, mint: str) -> Optional[Tuple[int, int]]:
+        return self.cursors.get(mint)
+
+    def advance(self, mint: str, cursor: Optional[Tuple[int, int]]):
+        if cursor is not None and (mint not in self.cursors or cursor > self.cursors[mint]):
+            self.cursors[mint] = cursor
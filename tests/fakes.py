@@ -0,0 +1,68 @@
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+import httpx
+
+from src.models.instruments.pool import TokenPool
+from src.pump_scraper import PumpScraperToken
+
+logger = logging.getLogger("tests")
+
+# fixed clock of the tokens built by `tokens`
+NOW_MS = 1734567890000
+SCRAPED = datetime(2024, 12, 19, tzinfo=timezone.utc)
+POOL = TokenPool("SOL/X", 1.5, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6)
+
+
+def coin(i: int, now_ms: Optional[int] = None) -> dict:
+    """Raw `/coins` item, `i` is its position in the feed, newest first."""
+    now_ms = now_ms or int(time.time() * 1000)
+    return {
+        "mint": f"m{i}", "name": f"n{i}", "symbol": f"S{i}", "description": None, "creator": "c",
+        "market_cap": 30.0 + i, "usd_market_cap": 5000.0 + i, "created_timestamp": now_ms - i * 1000,
+        "image_uri": None, "metadata_uri": None, "bonding_curve": None, "associated_bonding_curve": None,
+        "raydium_pool": None, "complete": False, "virtual_sol_reserves": 1, "virtual_token_reserves": 2,
+        "total_supply": 10, "show_name": True, "last_trade_timestamp": now_ms - i * 500,
+        "king_of_the_hill_timestamp": None, "reply_count": i, "last_reply": None, "nsfw": False,
+        "is_currently_live": False
+    }
+
+
+def tokens(count: int, with_pools: bool = False, **changes) -> List[PumpScraperToken]:
+    """Validated output rows of the first `count` coins, every other one priced when `with_pools` is set."""
+    return [
+        PumpScraperToken.model_validate({
+            **coin(i, now_ms=NOW_MS), "scraped_date": SCRAPED, "pool": POOL if with_pools and i % 2 else None, **changes
+        })
+        for i in range(count)
+    ]
+
+
+class CoinFeed:
+    """
+    Mock transport serving `total` coins from `/coins` and recording every request.
+
+    The feed starts at coin `start`, a negative start puts newer coins in front of the same feed.
+    """
+
+    def __init__(self, total: int, now_ms: Optional[int] = None, start: int = 0):
+        self.total = total
+        self.now_ms = now_ms or int(time.time() * 1000)
+        self.start = start
+        self.requests: List[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        offset = int(request.url.params.get("offset", 0))
+        limit = int(request.url.params.get("limit", 50))
+        items = [coin(self.start + i, self.now_ms) for i in range(offset, min(offset + limit, self.total))]
+        return httpx.Response(200, json=items)
+
+    def install(self, api):
+        api._client = httpx.AsyncClient(transport=httpx.MockTransport(self))
+
+
+def install(api, handler: Callable[[httpx.Request], httpx.Response]):
+    api._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
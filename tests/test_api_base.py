@@ -0,0 +1,80 @@
+import asyncio
+import warnings
+
+import httpx
+
+from src.api.api_base import BaseApi
+from src.api.pump import GetCoinsFilter, PumpApiCoinsFilter
+from src.utils.cache import ResponseCache
+from tests.fakes import install, logger
+
+URL = "https://frontend-api-v3.pump.fun/coins"
+
+
+def api_counting_requests():
+    api = BaseApi(logger=logger, base_url="https://frontend-api-v3.pump.fun")
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        number = len(requests)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=[number])
+
+    install(api, handler)
+    return api, requests
+
+
+def test_concurrent_identical_requests_share_one_call():
+    async def run():
+        api, requests = api_counting_requests()
+        results = await asyncio.gather(*(api._fetch(URL, PumpApiCoinsFilter()) for _ in range(5)))
+        await api.close()
+        return results, requests
+
+    results, requests = asyncio.run(run())
+
+    assert len(requests) == 1
+    assert len(set(results)) == 1
+
+
+def test_uncached_request_does_not_join_a_cached_one():
+    async def run():
+        api, requests = api_counting_requests()
+        api.cache = ResponseCache()
+        cached, fresh = await asyncio.gather(
+            api._fetch(URL, PumpApiCoinsFilter()),
+            api._fetch(URL, PumpApiCoinsFilter(), use_cache=False),
+        )
+        again = await api._fetch(URL, PumpApiCoinsFilter())
+        await api.close()
+        return cached, fresh, again, requests
+
+    cached, fresh, again, requests = asyncio.run(run())
+
+    assert len(requests) == 2
+    assert cached != fresh
+    assert again == cached
+
+
+def test_cache_key_ignores_parameter_order():
+    assert ResponseCache.key(URL, "limit=50&offset=0") == ResponseCache.key(URL, "offset=0&limit=50")
+    assert ResponseCache.key(URL, "limit=50&offset=0") != ResponseCache.key(URL, "limit=50&offset=50")
+
+
+def test_cache_key_has_the_parameters_that_are_sent():
+    params = GetCoinsFilter(is_graduated=None, max_created_date=None, min_created_date=None)
+
+    async def run():
+        api, requests = api_counting_requests()
+        await api._fetch(URL, params)
+        await api.close()
+        return requests
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        query = BaseApi.to_query_string(params)
+        requests = asyncio.run(run())
+
+    assert "None" not in query
+    assert ResponseCache.key(URL, query) == ResponseCache.key(URL, requests[0].url.query.decode())
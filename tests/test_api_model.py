@@ -0,0 +1,29 @@
+import pytest
+
+from src.models.integration.api import construct_validated
+from src.pump_scraper import PumpScraperToken
+from tests.fakes import NOW_MS, POOL, SCRAPED, coin
+
+
+@pytest.mark.parametrize("pool", [None, POOL])
+def test_construct_validated_matches_model_validate(pool):
+    # `construct_validated` writes pydantic's instance state itself, this pins it to what validation builds
+    validated = PumpScraperToken.model_validate({**coin(3, now_ms=NOW_MS), "pool": pool, "scraped_date": SCRAPED})
+    built = construct_validated(PumpScraperToken, dict(validated.__dict__), validated.model_fields_set)
+
+    assert built == validated
+    assert built.model_dump() == validated.model_dump()
+    assert built.model_dump_json() == validated.model_dump_json()
+    assert built.model_fields_set == validated.model_fields_set
+    assert built.__pydantic_extra__ == validated.__pydantic_extra__
+    assert built.__pydantic_private__ == validated.__pydantic_private__
+    assert built.model_copy(update={"reply_count": 7}).reply_count == 7
+    assert validated.reply_count == 3
+
+
+def test_construct_validated_keeps_the_fields_set_given():
+    validated = PumpScraperToken.model_validate({**coin(3, now_ms=NOW_MS), "scraped_date": SCRAPED})
+    built = construct_validated(PumpScraperToken, dict(validated.__dict__), {"mint", "scraped_date"})
+
+    assert built.model_fields_set == {"mint", "scraped_date"}
+    assert built.model_dump(exclude_unset=True) == {"mint": "m3", "scraped_date": SCRAPED}
@@ -0,0 +1,42 @@
+import time
+
+from src.utils.cache import ResponseCache
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+
+
+def test_byte_limit_evicts_and_skips_oversized_entries():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", b"12345", size=5)
+    cache.put("b", b"123456", size=6)
+    cache.put("c", b"x" * 11, size=11)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == b"123456"
+    assert cache.get("c") is None
+    assert cache.size == 6
+
+
+def test_entries_expire_with_the_ttl_of_the_longest_matching_fragment(monkeypatch):
+    cache = ResponseCache(ttl=30, ttls={"/pools/": 45, "/solana/pools/": 60, "/trades/": 0})
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.put("https://host/solana/pools/x?", b"pool")
+    cache.put("https://host/trades/x?", b"trade")
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 59)
+    assert cache.get("https://host/solana/pools/x?") == b"pool"
+    assert cache.get("https://host/trades/x?") is None
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.get("https://host/solana/pools/x?") is None
@@ -0,0 +1,39 @@
+import asyncio
+
+from src.utils.changes import ChangeTracker, OutputMode
+from src.utils.persistent_cache import LocalDirectoryBackend
+from tests.fakes import logger, tokens
+
+
+def test_snapshot_is_sharded_and_reloaded(tmp_path):
+    backend = LocalDirectoryBackend(tmp_path)
+
+    async def run():
+        tracker = ChangeTracker(logger, shards=4)
+        tracker.changes(tokens(100))
+        await tracker.save(backend)
+
+        reloaded = ChangeTracker(logger, shards=4)
+        await reloaded.load(backend)
+        return reloaded.changes(tokens(100, reply_count=1000), OutputMode.CHANGED)
+
+    rows = asyncio.run(run())
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"changes-{i}.json" for i in range(4)]
+    assert len(rows) == 100
+
+
+def test_diff_rows_name_the_change_and_the_changed_fields():
+    tracker = ChangeTracker(logger)
+    first = tracker.changes(tokens(1), OutputMode.DIFF)
+    second = tracker.changes(tokens(1, reply_count=1000), OutputMode.DIFF)
+    third = tracker.changes(tokens(1, reply_count=1000), OutputMode.DIFF)
+
+    assert first[0]["change"] == "new"
+    assert second == [{
+        "mint": "m0",
+        "change": "changed",
+        "changed_fields": ["reply_count"],
+        "changes": {"reply_count": {"old": 0, "new": 1000}},
+    }]
+    assert third == []
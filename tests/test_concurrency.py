@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.models.integration.api import ApiException
+from src.utils.concurrency import HostLimiters, is_overload
+
+
+def test_limiters_are_shared_per_registry():
+    limiters = HostLimiters()
+    limiter = limiters.for_host("pump.fun", rate=10, burst=20)
+
+    assert limiters.for_host("pump.fun", rate=1, burst=1) is limiter
+    assert HostLimiters().for_host("pump.fun", rate=10, burst=20) is not limiter
+
+
+def test_registries_work_across_event_loops():
+    async def run():
+        limiter = HostLimiters().for_host("pump.fun", rate=100, burst=1)
+        # the second acquisition waits on the bucket, which needs primitives of the running loop
+        await asyncio.gather(*(use(limiter) for _ in range(3)))
+
+    async def use(limiter):
+        async with limiter.slot():
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("error, overloaded", [
+    (httpx.ReadTimeout("timed out"), True),
+    (httpx.ConnectError("refused"), True),
+    (TimeoutError(), True),
+    (ApiException(429, "too many requests"), True),
+    (ApiException(503, "unavailable"), True),
+    (ApiException(404, "not found"), False),
+    (json.JSONDecodeError("bad", "", 0), False),
+    (KeyError("data"), False),
+])
+def test_only_timeouts_transport_errors_and_overload_statuses_count(error, overloaded):
+    assert is_overload(error) is overloaded
+
+
+def test_failed_parse_does_not_shrink_concurrency():
+    async def run():
+        limiter = HostLimiters().for_host("pump.fun", rate=100, burst=10, concurrency=4)
+        with pytest.raises(ValueError):
+            async with limiter.slot():
+                raise ValueError("malformed response")
+        return limiter.concurrency.limit
+
+    assert asyncio.run(run()) >= 4
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.condition import Condition, ConditionConstant, ConditionGroup, ConjunctionEnum, OperatorEnum
+
+
+def operands(condition):
+    return [c.field for c in condition.flatten(condition.conjunction)]
+
+
+def test_optimize_runs_the_most_selective_operand_first():
+    sample = [SimpleNamespace(a=i, b=i) for i in range(100)]
+    condition = Condition("a", OperatorEnum.GTE, 0) & Condition("b", OperatorEnum.GTE, 90)
+
+    assert operands(condition.optimize(sample)) == ["b", "a"]
+
+
+def test_optimize_keeps_raising_operands_in_place():
+    # `b` is None on most rows, so comparing it raises
+    sample = [SimpleNamespace(a=i, b=None if i % 10 else i, c=i) for i in range(100)]
+    condition = (
+        Condition("a", OperatorEnum.GTE, 0)
+        & Condition("b", OperatorEnum.GTE, 0)
+        & Condition("c", OperatorEnum.GTE, 90)
+    )
+
+    assert operands(condition.optimize(sample)) == ["c", "b", "a"]
+
+
+ROWS = [
+    SimpleNamespace(a=i, b=None if i % 3 == 0 else f"b{i % 3}", tags=["x"] if i % 2 else [])
+    for i in range(12)
+]
+TRUE, FALSE = ConditionConstant(is_true=True), ConditionConstant(is_true=False)
+A_HIGH = Condition("a", OperatorEnum.GTE, 6)
+B_NULL = Condition("b", OperatorEnum.NULL, None)
+B_SET = Condition("b", OperatorEnum.NOT_NULL, None)
+
+
+@pytest.mark.parametrize("condition", [
+    # constant folding
+    A_HIGH & TRUE,
+    A_HIGH & FALSE,
+    FALSE | A_HIGH,
+    TRUE | A_HIGH,
+    TRUE & TRUE,
+    FALSE | FALSE,
+    (A_HIGH & TRUE) | (B_NULL & FALSE),
+    ConditionGroup(left=A_HIGH, conjunction=ConjunctionEnum.OR),
+    # IN / NOT IN, a value that is not a set or a list matches nothing
+    Condition("a", OperatorEnum.IN, {1, 2, 3}),
+    Condition("a", OperatorEnum.IN, [1, 2, 3]),
+    Condition("a", OperatorEnum.NOT_IN, {1, 2, 3}),
+    Condition("b", OperatorEnum.IN, "b1"),
+    Condition("b", OperatorEnum.NOT_IN, "b1"),
+    Condition("a", OperatorEnum.NOT_IN, (1, 2)),
+    Condition("b", OperatorEnum.IN, {None, "b2"}),
+    Condition("tags", OperatorEnum.IN, [[], ["y"]]),
+    Condition("tags", OperatorEnum.NOT_IN, [[]]),
+    Condition("tags", OperatorEnum.IN, [1, 2]),
+    Condition("tags", OperatorEnum.NOT_IN, {1, 2}),
+    # NULL / NOT NULL
+    B_NULL,
+    B_SET,
+    B_NULL | B_SET,
+    # mixed AND / OR nesting
+    (A_HIGH | B_NULL) & B_SET,
+    A_HIGH & (B_NULL | Condition("b", OperatorEnum.EQ, "b2")) | Condition("a", OperatorEnum.LT, 2),
+    (Condition("a", OperatorEnum.GT, 2) & Condition("a", OperatorEnum.LTE, 9) & B_SET)
+    | (B_NULL & Condition("a", OperatorEnum.NEQ, 0)) | (Condition(lambda row: len(row.tags), OperatorEnum.EQ, 1) & FALSE),
+    ((A_HIGH | B_NULL) & (Condition("b", OperatorEnum.IN, ["b1"]) | Condition("a", OperatorEnum.EQ, 9))) | FALSE,
+])
+def test_compile_matches_evaluate(condition):
+    def outcomes(predicate):
+        # the result on each row, or the type of the error it raised
+        results = []
+        for row in ROWS:
+            try:
+                results.append(predicate(row))
+            except Exception as e:
+                results.append(type(e))
+        return results
+
+    expected = outcomes(condition.evaluate)
+
+    assert outcomes(condition.compile()) == expected
+    assert outcomes(condition.optimize(ROWS).compile()) == expected
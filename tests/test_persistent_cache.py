@@ -0,0 +1,41 @@
+import asyncio
+import json
+import time
+
+from src.utils.persistent_cache import LocalDirectoryBackend, PersistentCache
+from tests.fakes import logger
+
+
+def test_namespace_is_split_into_shards_and_read_back(tmp_path):
+    backend = LocalDirectoryBackend(tmp_path)
+
+    async def run():
+        cache = PersistentCache(backend, logger, shards=4)
+        for i in range(100):
+            await cache.put("pools", f"https://host/pools/{i}", f"body {i}")
+        await cache.flush()
+        again = PersistentCache(backend, logger, shards=4)
+        return [await again.get("pools", f"https://host/pools/{i}") for i in range(100)]
+
+    values = asyncio.run(run())
+    records = {path.name: json.loads(path.read_text()) for path in tmp_path.iterdir()}
+
+    assert values == [f"body {i}" for i in range(100)]
+    assert sorted(records) == [f"cache-pools-{i}.json" for i in range(4)]
+    assert all(0 < len(record) < 50 for record in records.values())
+
+
+def test_flush_keeps_the_newest_entries_within_the_byte_limit(tmp_path, monkeypatch):
+    backend = LocalDirectoryBackend(tmp_path)
+    now = time.time()
+
+    async def run():
+        cache = PersistentCache(backend, logger, max_bytes=250)
+        for i in range(10):
+            monkeypatch.setattr(time, "time", lambda: now + i)
+            await cache.put("pools", str(i), "x" * 100)
+        await cache.flush()
+        again = PersistentCache(backend, logger)
+        return [await again.get("pools", str(i)) is not None for i in range(10)]
+
+    assert asyncio.run(run()) == [False] * 8 + [True] * 2
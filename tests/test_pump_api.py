@@ -0,0 +1,54 @@
+import asyncio
+
+from src.api.pump import PumpApi, SearchCoinFilter
+from tests.fakes import CoinFeed, logger
+
+
+def get_tokens(feed: CoinFeed, **kwargs):
+    async def run():
+        api = PumpApi(logger=logger)
+        feed.install(api)
+        try:
+            return await api.get_tokens(**kwargs)
+        finally:
+            await api.close()
+
+    return asyncio.run(run())
+
+
+def test_get_tokens_stops_at_limit():
+    feed = CoinFeed(total=1000)
+    coins = get_tokens(feed, limit=120, concurrency=4)
+
+    assert [c.mint for c in coins] == [f"m{i}" for i in range(120)]
+    assert len(feed.requests) == 3
+
+
+def test_get_tokens_stops_when_the_feed_runs_out():
+    feed = CoinFeed(total=130)
+    coins = get_tokens(feed, limit=1000, concurrency=4)
+
+    assert [c.mint for c in coins] == [f"m{i}" for i in range(130)]
+
+
+def test_get_tokens_stops_at_cutoff():
+    feed = CoinFeed(total=1000)
+    # the last coin of the second page is past the cutoff, so no later page can match
+    coins = get_tokens(feed, limit=1000, stop_when=lambda c: c.mint == "m99")
+
+    assert len(coins) == 100
+    assert max(int(r.url.params["offset"]) for r in feed.requests) == 50
+
+
+def test_concurrency_is_not_sent():
+    feed = CoinFeed(total=10)
+    get_tokens(feed, limit=10, concurrency=4)
+
+    assert all("concurrency" not in r.url.params for r in feed.requests)
+
+
+def test_concurrency_is_not_sent_with_a_search():
+    params = PumpApi.to_query_params(SearchCoinFilter(searchTerm="pepe", concurrency=4))
+
+    assert "concurrency" not in params
+    assert params["searchTerm"] == "pepe"
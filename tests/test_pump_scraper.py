@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from src.models.instruments.pump_token import PumpToken
+from src.pump_scraper import PumpScraper, PumpScraperToken
+from src.utils.condition import Condition, OperatorEnum
+from src.utils.record_batch import RecordBatch
+from tests.fakes import NOW_MS, POOL, SCRAPED, CoinFeed, coin, logger
+
+
+@pytest.mark.parametrize("pool", [None, POOL])
+def test_from_coin_matches_model_validate(pool):
+    # `from_coin` merges a coin with the fields this scraper adds, the result must be what validation builds
+    raw = coin(3, now_ms=NOW_MS)
+    built = PumpScraperToken.from_coin(PumpToken.model_validate(raw), pool=pool, scraped_date=SCRAPED)
+    validated = PumpScraperToken.model_validate({**raw, "pool": pool, "scraped_date": SCRAPED})
+
+    assert built == validated
+    assert built.model_dump() == validated.model_dump()
+    assert built.model_dump_json() == validated.model_dump_json()
+    assert built.model_fields_set == validated.model_fields_set
+    assert built.model_copy(update={"reply_count": 7}).reply_count == 7
+
+
+def test_record_batch_round_trip_matches_model_validate():
+    raw = coin(3, now_ms=NOW_MS)
+    token = PumpScraperToken.model_validate({**raw, "scraped_date": SCRAPED})
+    rebuilt = RecordBatch.from_records(PumpScraperToken, [token]).record(0)
+
+    assert rebuilt == token
+    assert rebuilt.model_dump_json() == token.model_dump_json()
+
+
+def test_filters_are_optimized_once_per_run():
+    calls = []
+
+    def replies(token):
+        calls.append(token.mint)
+        return token.reply_count
+
+    async def run():
+        async with PumpScraper(logger=logger) as client:
+            CoinFeed(total=1000).install(client.pump_api)
+            conditions = Condition(replies, OperatorEnum.GTE, 0) & Condition(lambda t: t.nsfw, OperatorEnum.EQ, False)
+            return await client.get_results(conditions=conditions, limit=100, concurrency=2)
+
+    results = asyncio.run(run())
+
+    # the first page of 50 is sampled once, then every row is filtered once
+    assert len(results) == 100
+    assert len(calls) == 50 + 100
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+import pytest
+
+from src.models.integration.api import ApiException
+from src.utils.scripts import RetryBudget, retry
+
+
+class Client:
+    def __init__(self):
+        self.retry_budget = RetryBudget(min_tokens=1, ratio=0)
+        self.calls = 0
+
+    @retry(ApiException, tries=5, delay=0, deadline=10)
+    async def flaky(self):
+        self.calls += 1
+        raise ApiException(503, "unavailable")
+
+    @retry(ApiException, tries=3, delay=0, deadline=0.2)
+    async def slow(self):
+        self.calls += 1
+        await asyncio.sleep(5)
+
+
+def test_deadline_cancels_the_attempt_in_flight():
+    client = Client()
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        asyncio.run(client.slow())
+
+    assert time.monotonic() - started < 1
+    assert client.calls == 1
+
+
+def test_each_client_spends_its_own_budget():
+    first, second = Client(), Client()
+    for client in (first, second):
+        with pytest.raises(ApiException):
+            asyncio.run(client.flaky())
+
+    # one token each: a single retry, the second client was not starved by the first
+    assert first.calls == 2
+    assert second.calls == 2
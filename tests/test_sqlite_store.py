@@ -0,0 +1,106 @@
+import asyncio
+import sqlite3
+from datetime import timedelta
+
+import pytest
+
+from src.pump_scraper import PumpScraperToken
+from src.utils.condition import Condition, OperatorEnum
+from src.utils.sqlite_store import TOKEN_COLUMNS, SqliteStore, to_sql_value
+from tests.fakes import logger, tokens
+
+
+def test_query_applies_indexed_and_python_conditions_then_the_window(tmp_path):
+    store = SqliteStore(tmp_path / "history.db", PumpScraperToken, logger)
+
+    async def run():
+        await store.write(tokens(50, with_pools=True))
+        # `reply_count` has a column, `show_name` is only in the json document
+        conditions = Condition("reply_count", OperatorEnum.GTE, 10) & Condition("show_name", OperatorEnum.EQ, True)
+        return await store.query(conditions, sort="created_timestamp", descending=True, offset=5, limit=10)
+
+    results = asyncio.run(run())
+    snapshots = store.connection.execute("SELECT count(*) FROM pool_snapshots").fetchone()[0]
+    store.close()
+
+    assert [t.mint for t in results] == [f"m{i}" for i in range(15, 25)]
+    assert snapshots == 25
+
+
+def test_rewritten_token_is_replaced(tmp_path):
+    store = SqliteStore(tmp_path / "history.db", PumpScraperToken, logger)
+
+    async def run():
+        await store.write(tokens(3))
+        updated = tokens(1)[0].model_copy(update={"reply_count": 99})
+        await store.write([updated])
+        return await store.query(Condition("mint", OperatorEnum.EQ, "m0"))
+
+    results = asyncio.run(run())
+    store.close()
+
+    assert [(t.mint, t.reply_count) for t in results] == [("m0", 99)]
+    assert results[0].created_timestamp == tokens(1)[0].created_timestamp
+
+
+def with_last_reply(count: int) -> list:
+    # every third coin has no reply, the others replied later the higher their index
+    return [
+        t.model_copy(update={"last_reply": None if i % 3 == 0 else t.created_timestamp + timedelta(hours=i)})
+        for i, t in enumerate(tokens(count))
+    ]
+
+
+def test_last_reply_is_sorted_by_sqlite(tmp_path):
+    store = SqliteStore(tmp_path / "history.db", PumpScraperToken, logger)
+
+    async def run():
+        await store.write(with_last_reply(10))
+        return await store.query(sort="last_reply", descending=True, offset=1, limit=4)
+
+    results = asyncio.run(run())
+    store.close()
+
+    assert [t.mint for t in results] == ["m7", "m5", "m4", "m2"]
+
+
+def test_sort_without_a_column_is_applied_in_python_before_the_window(tmp_path):
+    store = SqliteStore(tmp_path / "history.db", PumpScraperToken, logger)
+
+    async def run():
+        await store.write([
+            t.model_copy(update={"description": None if i % 3 == 0 else f"d{9 - i}"}) for i, t in enumerate(tokens(10))
+        ])
+        ascending = await store.query(sort="description", descending=False, offset=4, limit=3)
+        descending = await store.query(sort="description", descending=True, offset=4)
+        return ascending, descending
+
+    ascending, descending = asyncio.run(run())
+    store.close()
+
+    # missing values first ascending and last descending, like sqlite
+    assert [t.mint for t in ascending] == ["m8", "m7", "m5"]
+    assert [t.mint for t in descending][:2] == ["m7", "m8"]
+    assert {t.mint for t in descending[2:]} == {"m0", "m3", "m6", "m9"}
+    with pytest.raises(ValueError):
+        asyncio.run(store.query(sort="not_a_field"))
+
+
+def test_columns_added_since_are_filled_from_stored_documents(tmp_path):
+    path = tmp_path / "history.db"
+    stored = with_last_reply(6)
+    old_columns = {k: v for k, v in TOKEN_COLUMNS.items() if k != "last_reply"}
+    with sqlite3.connect(path) as connection:
+        connection.execute(f"CREATE TABLE tokens ({', '.join(f'{k} {v}' for k, v in old_columns.items())}, data TEXT NOT NULL)")
+        connection.executemany(
+            f"INSERT INTO tokens ({', '.join(old_columns)}, data) VALUES ({', '.join('?' * (len(old_columns) + 1))})",
+            [[to_sql_value(getattr(t, k)) for k in old_columns] + [t.model_dump_json()] for t in stored]
+        )
+    connection.close()
+
+    store = SqliteStore(path, PumpScraperToken, logger)
+    results = asyncio.run(store.query(sort="last_reply", descending=True))
+    store.close()
+
+    assert [t.mint for t in results][:4] == ["m5", "m4", "m2", "m1"]
+    assert {t.mint for t in results[4:]} == {"m0", "m3"}
@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+
+from src.pump_scraper import PumpScraper
+from src.utils.watermark import TradeCursors
+from tests.fakes import install, logger
+
+# trades of each mint, the newest has the highest index
+TRADES = {"a": 450, "flaky": 450}
+
+
+def trade(mint: str, i: int) -> dict:
+    return {
+        "signature": f"{mint}-{i}", "mint": mint, "sol_amount": 1, "token_amount": 1, "is_buy": True, "user": "u",
+        "timestamp": 1734567890 + i, "tx_index": i % 3, "slot": 1000 + i // 3
+    }
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    mint = request.url.path.rsplit("/", 1)[-1]
+    offset, limit = int(request.url.params["offset"]), int(request.url.params["limit"])
+    if mint == "flaky" and offset > 0:
+        return httpx.Response(404, text="gone")
+    ids = list(range(TRADES[mint] - 1, -1, -1))[offset:offset + limit]
+    return httpx.Response(200, json=[trade(mint, i) for i in ids])
+
+
+def fetch(cursors: TradeCursors):
+    async def run():
+        async with PumpScraper(logger=logger) as client:
+            install(client.pump_api, handler)
+            signatures = []
+            async for trades in client.iter_trades(["a", "flaky"], cursors=cursors, concurrency=2):
+                signatures.extend(t.signature for t in trades)
+            return signatures
+
+    return asyncio.run(run())
+
+
+def test_mint_failing_halfway_yields_nothing_and_keeps_its_cursor():
+    cursors = TradeCursors(logger)
+    signatures = fetch(cursors)
+
+    assert len(signatures) == 450
+    assert all(s.startswith("a-") for s in signatures)
+    assert cursors.get("a") == (1000 + 449 // 3, 449 % 3)
+    assert cursors.get("flaky") is None
+
+
+def test_completed_mint_resumes_after_its_cursor():
+    cursors = TradeCursors(logger)
+    fetch(cursors)
+
+    assert fetch(cursors) == []
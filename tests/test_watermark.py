@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+from src.pump_scraper import PumpScraper
+from src.utils.timestamps import from_epoch_ms
+from src.utils.watermark import Watermark
+from tests.fakes import CoinFeed, logger
+
+# the feed must be recent, `GetCoinsFilter` stops at coins older than a day
+RECENT_MS = int(time.time() * 1000)
+
+
+def scrape(feed: CoinFeed, watermark: Watermark, limit: int):
+    async def collect():
+        async with PumpScraper(logger=logger) as client:
+            feed.install(client.pump_api)
+            mints = []
+            batches = client.iter_batches(watermark=watermark, sort=watermark.field, limit=limit, concurrency=4)
+            async for batch in batches:
+                mints.extend(t.mint for t in batch)
+            return mints
+
+    return asyncio.run(collect())
+
+
+def test_first_run_moves_the_mark():
+    watermark = Watermark("created_timestamp")
+    mints = scrape(CoinFeed(total=1000, now_ms=RECENT_MS), watermark, limit=100)
+
+    assert len(mints) == 100
+    assert watermark.advance()
+    assert watermark.mints == {"m0"}
+
+
+def test_run_cut_by_the_limit_keeps_the_mark():
+    watermark = Watermark("created_timestamp")
+    scrape(CoinFeed(total=1000, now_ms=RECENT_MS), watermark, limit=100)
+    watermark.advance()
+    mark = watermark.value
+
+    # 300 new coins, more than the limit
+    watermark = Watermark("created_timestamp", value=mark, mints=watermark.mints)
+    mints = scrape(CoinFeed(total=1300, now_ms=RECENT_MS, start=-300), watermark, limit=100)
+
+    assert mints == [f"m{i}" for i in range(-300, -200)]
+    assert not watermark.advance()
+    assert watermark.value == mark
+
+
+def test_run_reaching_the_mark_moves_it():
+    watermark = Watermark("created_timestamp")
+    scrape(CoinFeed(total=1000, now_ms=RECENT_MS), watermark, limit=100)
+    watermark.advance()
+
+    watermark = Watermark("created_timestamp", value=watermark.value, mints=watermark.mints)
+    mints = scrape(CoinFeed(total=1300, now_ms=RECENT_MS, start=-300), watermark, limit=1000)
+
+    assert mints == [f"m{i}" for i in range(-300, 0)]
+    assert watermark.advance()
+    assert watermark.mints == {"m-300"}
+
+
+def test_run_reaching_the_end_of_the_feed_moves_the_mark():
+    # older than every coin of the feed
+    watermark = Watermark("created_timestamp", value=from_epoch_ms(RECENT_MS - 1_000_000))
+    mints = scrape(CoinFeed(total=40, now_ms=RECENT_MS), watermark, limit=100)
+
+    assert len(mints) == 40
+    assert watermark.exhausted and not watermark.reached
+    assert watermark.advance()
+    assert watermark.mints == {"m0"}
+
+
+def test_mint_seen_at_the_mark_is_returned_once_it_moves_past_it():
+    watermark = Watermark("last_trade_timestamp")
+    scrape(CoinFeed(total=1000, now_ms=RECENT_MS), watermark, limit=100)
+    watermark.advance()
+    assert watermark.mints == {"m0"}
+
+    # 30s later every coin traded again, m0 included
+    watermark = Watermark("last_trade_timestamp", value=watermark.value, mints=watermark.mints)
+    mints = scrape(CoinFeed(total=1000, now_ms=RECENT_MS + 30_000), watermark, limit=1000)
+
+    assert mints == [f"m{i}" for i in range(61)]